@@ -0,0 +1,230 @@
+"""
+Ballot-polling risk-limiting audits.
+
+A ballot-polling audit checks a reported plurality outcome by reading
+randomly sampled paper ballots until there is strong enough evidence that
+the reported winner really won, or until the sample grows so large that a
+full hand count is called for. The BRAVO test (Lindeman, Stark and Yates)
+keeps, for the winner and each loser, the ratio of the likelihood of the
+sample under the reported results to its likelihood under a tie; the audit
+stops once every ratio reaches 1 / risk_limit.
+
+The ballots are read from a manifest: a text file with one ballot per line,
+in the form BallotBox keys take (a candidate name, or a JSON list or dict).
+An index of the offset of every line is built once, next to the manifest,
+and both files are memory-mapped, so auditing a contest of millions of
+ballots only reads the sampled lines. Ballots are sampled with replacement
+by hashing the seed with a counter (as in Rivest's sampler), so anyone with
+the seed can draw the same sample.
+"""
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+
+from ballotbox import margins
+from ballotbox.tally import get_preferences
+
+
+OFFSET = struct.Struct("<Q")
+
+
+def build_index(path, index_path):
+    """
+    Write the offset of every line of the manifest at 'path' to 'index_path',
+    as little-endian 64-bit integers, and return the number of lines.
+    """
+    count = 0
+    offset = 0
+    with open(path, "rb") as manifest:
+        with open(index_path, "wb") as index:
+            for line in manifest:
+                index.write(OFFSET.pack(offset))
+                offset += len(line)
+                count += 1
+    return count
+
+
+def decode_ballot(line):
+    """
+    Decode a line of a manifest, as a ballot box decodes its keys.
+    """
+    try:
+        return json.loads(line)
+    except ValueError:
+        return line
+
+
+def get_first_preference(vote):
+    """
+    Return the candidate a ballot counts for in a plurality count, or None if
+    it ranks no single candidate first.
+    """
+    preferences = get_preferences(vote)
+    ranks = [rank for rank in preferences.values() if rank > 0]
+    if not ranks:
+        return None
+    first = [candidate for candidate, rank in preferences.items()
+             if rank == min(ranks)]
+    if len(first) == 1:
+        return first[0]
+
+
+class BallotManifest(object):
+    """
+    A memory-mapped manifest of ballots, read a line at a time.
+
+    The index is kept in 'index_path' (by default, the manifest's path with
+    ".idx" added) and is built again if it is older than the manifest.
+    """
+    def __init__(self, path, index_path=None):
+        if index_path is None:
+            index_path = path + ".idx"
+        if (not os.path.exists(index_path) or
+                os.path.getmtime(index_path) < os.path.getmtime(path)):
+            build_index(path, index_path)
+        self.path = path
+        self.index_path = index_path
+        self.size = os.path.getsize(path)
+        self.ballot_count = os.path.getsize(index_path) // OFFSET.size
+        self._files = []
+        self._data = self._map(path)
+        self._index = self._map(index_path)
+
+    def _map(self, path):
+        handle = open(path, "rb")
+        self._files.append(handle)
+        if not os.path.getsize(path):
+            return ""
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.ballot_count
+
+    def get_ballot(self, index):
+        """
+        Return the decoded ballot on the line at 'index' (counting from 0).
+        """
+        if not 0 <= index < self.ballot_count:
+            raise IndexError("no ballot %s in the manifest" % index)
+        start, = OFFSET.unpack_from(self._index, index * OFFSET.size)
+        if index + 1 < self.ballot_count:
+            end, = OFFSET.unpack_from(self._index, (index + 1) * OFFSET.size)
+        else:
+            end = self.size
+        return decode_ballot(self._data[start:end].rstrip("\r\n"))
+
+    def close(self):
+        for data in (self._data, self._index):
+            if data:
+                data.close()
+        for handle in self._files:
+            handle.close()
+        self._files = []
+
+
+def get_sample(seed, ballot_count):
+    """
+    Generate the indexes of a sample of ballots, with replacement, by hashing
+    the seed with a counter: the same seed always gives the same sample.
+    """
+    if ballot_count < 1:
+        raise ValueError("there are no ballots to sample")
+    counter = 0
+    while True:
+        counter += 1
+        digest = hashlib.sha256("%s,%d" % (seed, counter)).hexdigest()
+        yield int(digest, 16) % ballot_count
+
+
+class BallotPollingAudit(object):
+    """
+    The BRAVO test of a reported plurality outcome.
+
+    The parameter 'reported' is a dict mapping each candidate to their
+    reported votes (e.g., the first_preferences of a tally), and 'risk_limit'
+    is the largest chance the audit may take of confirming a wrong outcome.
+    Ballots are added one at a time, updating the logarithm of each test
+    statistic; the audit is confirmed as soon as every one of them reaches
+    log(1 / risk_limit).
+    """
+    def __init__(self, reported, risk_limit):
+        margin = margins.get_plurality_margin(reported)
+        if margin is None or not margin[0]:
+            raise ValueError("the reported results have no single winner")
+        ranking = sorted(
+            [(votes, candidate) for candidate, votes in reported.items()],
+            reverse=True)
+        self.winner = ranking[0][1]
+        self.reported = reported
+        self.risk_limit = risk_limit
+        self.threshold = math.log(1.0 / risk_limit)
+        self.sample_size = 0
+        # for each loser, the log of the factor a ballot for the winner or
+        # for the loser multiplies the test statistic by
+        self.weights = {}
+        self.statistics = {}
+        winner_votes = reported[self.winner]
+        for votes, loser in ranking[1:]:
+            share = winner_votes / float(winner_votes + votes)
+            loser_weight = None
+            if votes:
+                loser_weight = math.log(2 * (1 - share))
+            self.weights[loser] = (math.log(2 * share), loser_weight)
+            self.statistics[loser] = 0.0
+
+    def add_ballot(self, vote):
+        """
+        Add a sampled ballot to the test, returning whether the audit is now
+        confirmed.
+        """
+        self.sample_size += 1
+        candidate = get_first_preference(vote)
+        if candidate == self.winner:
+            for loser, (winner_weight, loser_weight) in self.weights.items():
+                self.statistics[loser] += winner_weight
+        elif candidate in self.statistics:
+            winner_weight, loser_weight = self.weights[candidate]
+            if loser_weight is None:
+                # a vote for a candidate reported to have none
+                self.statistics[candidate] = float("-inf")
+            else:
+                self.statistics[candidate] += loser_weight
+        return self.is_confirmed
+
+    @property
+    def is_confirmed(self):
+        return min(self.statistics.values()) >= self.threshold
+
+    def get_expected_sample_size(self):
+        """
+        Return the approximate number of ballots the audit needs if the
+        reported results are right, from the closest contest between the
+        winner and a loser.
+        """
+        total = float(sum(self.reported.values()))
+        sizes = []
+        for loser, (winner_weight, loser_weight) in self.weights.items():
+            drift = self.reported[self.winner] / total * winner_weight
+            if loser_weight is not None:
+                drift += self.reported[loser] / total * loser_weight
+            sizes.append(self.threshold / drift)
+        return int(math.ceil(max(sizes)))
+
+    def run(self, manifest, seed, max_sample_size=None):
+        """
+        Sample ballots from a BallotManifest until the audit is confirmed, or
+        until 'max_sample_size' ballots have been sampled (after which a full
+        hand count is needed). Returns whether the audit was confirmed.
+        """
+        if not len(manifest):
+            raise ValueError("the manifest %s has no ballots" % manifest.path)
+        for index in get_sample(seed, len(manifest)):
+            if self.is_confirmed:
+                return True
+            if (max_sample_size is not None and
+                    self.sample_size >= max_sample_size):
+                return False
+            self.add_ballot(manifest.get_ballot(index))
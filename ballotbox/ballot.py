@@ -1,8 +1,22 @@
+import collections
+import copy
 import json
 
 from zope.interface import implements
 
 from ballotbox.iballot import IBallotBox
+from ballotbox.results import Results
+from ballotbox.tally import Tally, add_ranks, get_preferences
+
+
+def copy_results(results):
+    """
+    Return a copy of a method's results: of the Results, or of the list (of
+    tuples) or other value some methods return.
+    """
+    if isinstance(results, Results):
+        return results.copy()
+    return copy.copy(results)
 
 
 class BallotBox(dict):
@@ -10,8 +24,19 @@ class BallotBox(dict):
     """
     implements(IBallotBox)
 
+    result_cache_size = 32
+
     def __init__(self, method=None, data={}, *args, **kwargs):
         super(BallotBox, self).__init__(data)
+        # the rank histogram and the candidate index are built on first use,
+        # and then kept up to date as votes are added
+        self._histogram = None
+        self._candidates = None
+        # counted every time the ballots change; results are only reused
+        # while it stays the same
+        self.version = 0
+        self._results = collections.OrderedDict()
+        self._tally = None
         # instantiate the voting method class
         if method:
             #import pdb;pdb.set_trace()
@@ -32,6 +57,49 @@ class BallotBox(dict):
         """
         key = self._encode(key)
         super(BallotBox, self).__setitem__(key, value)
+        self._invalidate()
+
+    def __delitem__(self, key):
+        """
+        x.__delitem__(y) <==> del x[y]
+        """
+        key = self._encode(key)
+        super(BallotBox, self).__delitem__(key)
+        self._invalidate()
+
+    def clear(self):
+        """
+        D.clear() -> None.  Remove all items from D.
+        """
+        super(BallotBox, self).clear()
+        self._invalidate()
+
+    def pop(self, key, *args):
+        """
+        D.pop(k[,d]) -> v, remove specified key and return the corresponding
+        value.
+        """
+        key = self._encode(key)
+        self._invalidate()
+        return super(BallotBox, self).pop(key, *args)
+
+    def popitem(self):
+        """
+        D.popitem() -> (k, v), remove and return some (key, value) pair as a
+        2-tuple.
+        """
+        key, value = super(BallotBox, self).popitem()
+        self._invalidate()
+        return self._decode(key), value
+
+    def setdefault(self, key, default=None):
+        """
+        D.setdefault(k[,d]) -> D.get(k,d), also set D[k]=d if k not in D
+        """
+        key = self._encode(key)
+        if not super(BallotBox, self).__contains__(key):
+            self._invalidate()
+        return super(BallotBox, self).setdefault(key, default)
 
     def has_key(self, key):
         """
@@ -81,6 +149,19 @@ class BallotBox(dict):
         """
         data = [(self._encode(key), value) for key, value in vote.items()]
         super(BallotBox, self).update(dict(data))
+        self._invalidate()
+
+    def _invalidate(self):
+        # a change other than adding votes may take candidates or ranks away,
+        # so the statistics are built again the next time they are needed
+        self._histogram = None
+        self._candidates = None
+        self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self._results.clear()
+        self._tally = None
 
     def _is_string(self, data):
         if isinstance(data, basestring):
@@ -104,17 +185,25 @@ class BallotBox(dict):
         candidate, or a dictionary representing a set of preferences cast by a
         single voter.
         """
-        vote = self._encode(vote)
-        self.setdefault(vote, 0)
-        self[vote] += 1
+        self.add_votes(vote, 1)
 
     def add_votes(self, vote, count):
         """
         For a unique vote, add the number of times it was voted for.
         """
-        vote = self._encode(vote)
-        self.setdefault(vote, 0)
-        self[vote] += count
+        key = self._encode(vote)
+        super(BallotBox, self).__setitem__(key, self.get(key, 0) + count)
+        self._changed()
+        if self._histogram is None and self._candidates is None:
+            return
+        # decoded from the key, so the candidates are the same as when the
+        # statistics are built from the ballots
+        preferences = get_preferences(self._decode(key))
+        if self._histogram is not None:
+            add_ranks(self._histogram, preferences, count)
+        if self._candidates is not None:
+            for candidate in preferences:
+                self._candidates.setdefault(candidate, len(self._candidates))
 
     def batch_votes(self, votes):
         """
@@ -133,11 +222,104 @@ class BallotBox(dict):
         """
         return sum(self.values())
 
+    def get_histogram(self):
+        """
+        Return a dict mapping each candidate to a dict of the number of votes
+        giving them each rank.
+
+        The histogram is built with a single pass over the ballots the first
+        time it is asked for, and is then updated as votes are added, so
+        methods which only need the histogram can be counted without walking
+        (and decoding) the ballots again.
+        """
+        if self._histogram is None:
+            histogram = {}
+            for vote, count in self.items():
+                add_ranks(histogram, get_preferences(vote), count)
+            self._histogram = histogram
+        return self._histogram
+
+    def get_candidate_index(self):
+        """
+        Return a dict mapping every candidate on any ballot to their position
+        in the order they were first seen.
+
+        Like the histogram, the index is built with a single pass over the
+        ballots the first time it is asked for, and is then updated as votes
+        are added, so that methods need not decode the ballots to find the
+        candidates.
+        """
+        if self._candidates is None:
+            candidates = {}
+            for key in super(BallotBox, self).iterkeys():
+                for candidate in get_preferences(self._decode(key)):
+                    candidates.setdefault(candidate, len(candidates))
+            self._candidates = candidates
+        return self._candidates
+
+    def get_candidates(self):
+        """
+        Return a sorted list of every candidate on any ballot.
+        """
+        return sorted(self.get_candidate_index())
+
     def get_winner(self, *args, **kwargs):
         """
         Determine the winner, if one exists.
 
         This is a wrapper for the method of the same name on the IVotingMethod
         implementation class.
+
+        The results are kept until the ballots change, so asking again with
+        the same method and arguments does not count again; the last
+        'result_cache_size' different calls (e.g., for different position
+        counts) are kept, the least recently used being dropped first.
+        """
+        try:
+            key = (self.method, args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            # unhashable arguments are counted every time
+            return self.method.get_winner(self, *args, **kwargs)
+        if key in self._results:
+            results = self._results.pop(key)
+        else:
+            results = self.method.get_winner(self, *args, **kwargs)
+            if len(self._results) >= self.result_cache_size:
+                self._results.popitem(last=False)
+        self._results[key] = results
+        # each caller gets its own copy, so that changing it doesn't change
+        # the kept results
+        return copy_results(results)
+
+    def get_tally(self):
+        """
+        Decode the ballots once and return a Tally of them, which is kept
+        until the ballots change.
+        """
+        if self._tally is None:
+            self._tally = Tally(self)
+        return self._tally
+
+    def get_margin(self, *args, **kwargs):
+        """
+        Return the margin of victory of the count, as a (lower, upper) tuple
+        of bounds on the number of ballots that must change for a different
+        candidate to tie with or beat the winner.
+
+        This is a wrapper for the get_tally_margin method of the
+        IMarginVotingMethod implementation class.
+        """
+        return self.get_tally().get_margin(self.method, *args, **kwargs)
+
+    def evaluate(self, methods):
+        """
+        Count the ballots with several voting methods, sharing one tally
+        between them.
+
+        Each item of 'methods' is either an IVotingMethod provider or a
+        (method, kwargs) tuple, where 'kwargs' is a dict of keyword arguments
+        for its get_winner method. Returns a list of the results of each
+        method, in the same order.
         """
-        return self.method.get_winner(self, *args, **kwargs)
+        return self.get_tally().evaluate(methods)
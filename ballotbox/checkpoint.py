@@ -0,0 +1,172 @@
+"""
+Saving a count part of the way through, and carrying it on later.
+
+A checkpoint file holds a tally and how far a count of it has got, so that a
+long count which is stopped (or crashes) can carry on without taking in the
+ballots again or counting the rounds already counted. The file holds:
+
+    * a header: the magic string "BBCK", the format version, the number of
+      candidates, the number of unique ballots and whether the ballots have
+      an unranked tier (see ballotbox.tally.Tally)
+
+    * the candidate table: for each candidate, the length of their name in
+      UTF-8 and the name
+
+    * a row for each unique ballot, as in a ballot file (see
+      ballotbox.storage), but with a 64-bit vote count
+
+    * the pairwise counts, if the tally had built them: for each ordered
+      pair of candidates the votes preferring the first, and for each
+      unordered pair the votes ranking them level
+
+    * the state of the count, as JSON (for the elimination methods, the
+      candidates remaining and the scores of the rounds counted so far)
+
+The tally's ballots are kept as unique ballots with their counts, so the
+file grows with the number of different ballots, not with the number of
+voters.
+"""
+import json
+import os
+import struct
+
+from ballotbox.storage import NAME_LENGTH, UNLISTED
+from ballotbox.tally import Tally, get_preferences
+
+
+MAGIC = "BBCK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQB")
+COUNT = struct.Struct("<Q")
+LENGTH = struct.Struct("<I")
+
+
+def get_row_struct(candidate_count):
+    return struct.Struct("<%sHQ" % candidate_count)
+
+
+def get_unique_ballots(ballots):
+    """
+    Fold a tally's (vote, count) tuples into a dict mapping each ballot's
+    ranks, as a sorted tuple of (candidate, rank) pairs, to its votes.
+    """
+    unique = {}
+    for vote, votes in ballots:
+        key = tuple(sorted(get_preferences(vote).items()))
+        unique[key] = unique.get(key, 0) + votes
+    return unique
+
+
+def save_checkpoint(path, tally, state=None):
+    """
+    Write a tally, with the state of a count of it, to 'path'. The file is
+    written beside it first and then moved into place, so a crash while
+    saving leaves the last checkpoint as it was.
+    """
+    candidates = list(tally.candidates)
+    index = dict([(candidate, position)
+                  for position, candidate in enumerate(candidates)])
+    unique = get_unique_ballots(tally.ballots)
+    row_struct = get_row_struct(len(candidates))
+    pairwise = tally._pairwise
+    chunks = [HEADER.pack(MAGIC, VERSION, len(candidates), len(unique),
+                          int(tally.unranked_tier))]
+    for candidate in candidates:
+        name = unicode(candidate).encode("utf-8")
+        chunks.append(NAME_LENGTH.pack(len(name)) + name)
+    for preferences, votes in sorted(unique.items()):
+        ranks = [UNLISTED] * len(candidates)
+        for candidate, rank in preferences:
+            ranks[index[candidate]] = rank
+        chunks.append(row_struct.pack(*(ranks + [votes])))
+    chunks.append(struct.pack("<B", pairwise is not None))
+    if pairwise is not None:
+        for option1 in candidates:
+            for option2 in candidates:
+                if option1 != option2:
+                    chunks.append(COUNT.pack(
+                        pairwise.get("%s > %s" % (option1, option2), 0)))
+        for position, option1 in enumerate(candidates):
+            for option2 in candidates[position + 1:]:
+                chunks.append(COUNT.pack(
+                    pairwise.get("%s = %s" % (option1, option2), 0) +
+                    pairwise.get("%s = %s" % (option2, option1), 0)))
+    state = json.dumps(state)
+    chunks.append(LENGTH.pack(len(state)) + state)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as checkpoint_file:
+        checkpoint_file.write("".join(chunks))
+    os.rename(temporary, path)
+
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint file, returning the tally and the state of the count.
+    """
+    with open(path, "rb") as checkpoint_file:
+        data = checkpoint_file.read()
+    magic, version, candidate_count, ballot_count, unranked_tier = (
+        HEADER.unpack_from(data))
+    if magic != MAGIC:
+        raise ValueError("%s is not a checkpoint file" % path)
+    if version != VERSION:
+        raise ValueError("unknown checkpoint file version %s" % version)
+    offset = HEADER.size
+    candidates = []
+    for position in xrange(candidate_count):
+        length, = NAME_LENGTH.unpack_from(data, offset)
+        offset += NAME_LENGTH.size
+        candidates.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    row_struct = get_row_struct(candidate_count)
+    ballots = []
+    for row in xrange(ballot_count):
+        values = row_struct.unpack_from(data, offset)
+        offset += row_struct.size
+        preferences = dict([
+            (candidate, rank)
+            for candidate, rank in zip(candidates, values[:-1])
+            if rank != UNLISTED])
+        ballots.append((preferences, values[-1]))
+    has_pairwise, = struct.unpack_from("<B", data, offset)
+    offset += 1
+    pairwise = None
+    if has_pairwise:
+        pairwise = {}
+        for option1 in candidates:
+            for option2 in candidates:
+                if option1 != option2:
+                    votes, = COUNT.unpack_from(data, offset)
+                    offset += COUNT.size
+                    if votes:
+                        pairwise["%s > %s" % (option1, option2)] = votes
+        for position, option1 in enumerate(candidates):
+            for option2 in candidates[position + 1:]:
+                votes, = COUNT.unpack_from(data, offset)
+                offset += COUNT.size
+                if votes:
+                    pairwise["%s = %s" % (option1, option2)] = votes
+    length, = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    state = json.loads(data[offset:offset + length])
+    tally = Tally(ballots=ballots, pairwise=pairwise, candidates=candidates,
+                  unranked_tier=bool(unranked_tier))
+    return tally, state
+
+
+def count_with_checkpoints(method, path, tally=None, **kwargs):
+    """
+    Count a tally with an elimination method (one taking 'state' and
+    'checkpoint' arguments, such as Nanson's or Baldwin's), saving a
+    checkpoint to 'path' after every round. If 'path' already holds a
+    checkpoint, the count carries on from it, and the tally need not be
+    given.
+    """
+    state = None
+    if os.path.exists(path):
+        tally, state = load_checkpoint(path)
+
+    def checkpoint(state):
+        save_checkpoint(path, tally, state)
+    return method.get_tally_winner(
+        tally, state=state, checkpoint=checkpoint, **kwargs)
@@ -0,0 +1,301 @@
+"""
+The ballotbox command: counting contests from the command line.
+
+Each input is a contest: a text file with one ballot per line (a candidate's
+name, or a JSON list or dict, as a ballot box takes them), a ballot file (see
+ballotbox.storage), or "-" for standard input. The ballots are streamed in
+and folded into unique ballots (see ballotbox.compaction), then counted with
+every method given, sharing one tally between them.
+
+Methods are given by name, with any arguments for the method in parentheses
+and any for its get_winner method after a colon:
+
+    ballotbox -m FirstPastPostVoting -m "BordaVoting(mode=modified)" \\
+        -m "MinimaxVoting(mode=margins):candidate1=Nashville,candidate2=Memphis" \\
+        contest1.txt contest2.txt
+
+Argument values are read as JSON where they can be, and as strings
+otherwise. A method's module is only imported when the method is asked for,
+so the command starts quickly. Contests are counted in a pool of worker
+processes, one contest at a time each, and the results are written in the
+order the contests were given, as text, JSON (one object per line) or CSV.
+"""
+import argparse
+import csv
+import importlib
+import json
+import sys
+
+from ballotbox.audit import decode_ballot
+from ballotbox.compaction import CompactedBallots
+from ballotbox.results import Results
+from ballotbox.storage import MAGIC, BallotFile
+from ballotbox.tally import Tally
+
+
+# the module each method is found in, imported only when it is asked for
+METHODS = {
+    "FirstPastPostVoting": "ballotbox.singlewinner.plurality",
+    "MajorityRuleVoting": "ballotbox.singlewinner.simple",
+    "RangeVoting": "ballotbox.singlewinner.rated",
+    "ApprovalVoting": "ballotbox.singlewinner.rated",
+    "MajorityJudgement": "ballotbox.singlewinner.rated",
+    "BordaVoting": "ballotbox.singlewinner.preferential.borda",
+    "CopelandVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "KemenyYoungVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "NansonVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "BaldwinVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "MinimaxVoting": "ballotbox.singlewinner.preferential.minimax",
+    "BucklinVoting": "ballotbox.singlewinner.preferential.other",
+    }
+
+
+def parse_arguments(text):
+    """
+    Parse "name=value,name=value" into a dict, reading each value as JSON
+    where it can be.
+    """
+    arguments = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, separator, value = item.partition("=")
+        if not separator:
+            raise ValueError("expected name=value, not %r" % item)
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.strip()
+        arguments[str(name.strip())] = value
+    return arguments
+
+
+def parse_method(spec):
+    """
+    Parse a method spec into the method's name, the arguments for making it
+    and the arguments for its get_winner method.
+    """
+    spec, separator, winner_arguments = spec.partition(":")
+    name, separator, arguments = spec.partition("(")
+    if separator:
+        if not arguments.endswith(")"):
+            raise ValueError("unclosed arguments in %r" % spec)
+        arguments = arguments[:-1]
+    name = name.strip()
+    if name not in METHODS:
+        raise ValueError("unknown method %r (known methods: %s)" % (
+            name, ", ".join(sorted(METHODS))))
+    return (name, parse_arguments(arguments),
+            parse_arguments(winner_arguments))
+
+
+def get_method(spec):
+    """
+    Make the method of a spec, importing its module, returning it with the
+    arguments for its get_winner method.
+    """
+    name, arguments, winner_arguments = parse_method(spec)
+    factory = getattr(importlib.import_module(METHODS[name]), name)
+    return factory(**arguments), winner_arguments
+
+
+def read_ballots(path, stdin=None):
+    """
+    Generate the (vote, count) tuples of an input.
+    """
+    if path == "-":
+        for ballot in read_lines(stdin or sys.stdin):
+            yield ballot
+        return
+    with open(path, "rb") as input_file:
+        if input_file.read(len(MAGIC)) != MAGIC:
+            input_file.seek(0)
+            for ballot in read_lines(input_file):
+                yield ballot
+            return
+    ballot_file = BallotFile(path)
+    try:
+        for ballot in ballot_file.iteritems():
+            yield ballot
+    finally:
+        ballot_file.close()
+
+
+def read_lines(lines):
+    """
+    Generate the (vote, count) tuples of a text input, one ballot per line.
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield decode_ballot(line), 1
+
+
+def get_summary(result):
+    """
+    Return the winners and the ranking of a method's results; methods which
+    return a plain list of (score, choice) tuples rank only those.
+    """
+    if isinstance(result, Results):
+        return result.winners, result.ranking
+    ranking = list(result)
+    return [choice for score, choice in ranking[0:1]], ranking
+
+
+def count_contest(path, methods, stdin=None, compacted=None):
+    """
+    Count one contest with each of the (method, kwargs) tuples, returning a
+    dict of plain values describing the ballots and the results. The
+    contest's ballots are read from 'path' unless they are given, already
+    compacted.
+    """
+    if compacted is None:
+        compacted = CompactedBallots(read_ballots(path, stdin))
+    tally = Tally(ballots=compacted.items())
+    results = []
+    for spec, result in zip(
+            [spec for spec, method in methods],
+            tally.evaluate([method for spec, method in methods])):
+        winners, ranking = get_summary(result)
+        results.append({"method": spec, "winners": winners,
+                        "ranking": ranking})
+    return {"contest": path, "ballots": len(compacted),
+            "votes": compacted.total_votes,
+            "compression_ratio": compacted.compression_ratio,
+            "results": results}
+
+
+# the methods a worker process counts with, made when the worker starts
+_methods = None
+
+
+def _set_methods(specs):
+    global _methods
+    _methods = [(spec, get_method(spec)) for spec in specs]
+
+
+def _count_contest(contest):
+    path, compacted = contest
+    return count_contest(path, _methods, compacted=compacted)
+
+
+def count_contests(paths, specs, workers=1, stdin=None):
+    """
+    Generate the counts of the contests at 'paths', in order, counted in
+    'workers' processes (in this process if it is 1).
+    """
+    if workers == 1 or len(paths) < 2:
+        methods = [(spec, get_method(spec)) for spec in specs]
+        for path in paths:
+            yield count_contest(path, methods, stdin)
+        return
+    # a worker's standard input is /dev/null, so standard input is read here
+    contests = []
+    for path in paths:
+        compacted = None
+        if path == "-":
+            compacted = CompactedBallots(read_ballots(path, stdin))
+        contests.append((path, compacted))
+    # imported only when there are workers to start
+    import multiprocessing
+    pool = multiprocessing.Pool(workers, _set_methods, (specs,))
+    try:
+        for contest in pool.imap(_count_contest, contests):
+            yield contest
+    finally:
+        pool.close()
+        pool.join()
+
+
+def to_plain(value):
+    """
+    Make a value JSON can encode: choices which are tuples of candidates
+    become lists, and fractions become strings.
+    """
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    if isinstance(value, dict):
+        return dict([(key, to_plain(item)) for key, item in value.items()])
+    if value is None or isinstance(value, (basestring, int, long, float)):
+        return value
+    return str(value)
+
+
+def format_choice(choice):
+    if isinstance(choice, (list, tuple)):
+        return " > ".join([unicode(item) for item in choice])
+    return unicode(choice)
+
+
+def write_text(contest, output):
+    output.write(("%s: %s ballots, %s unique\n" % (
+        contest["contest"], contest["votes"],
+        contest["ballots"])).encode("utf-8"))
+    for result in contest["results"]:
+        winners = ", ".join([format_choice(winner)
+                             for winner in result["winners"]]) or "none"
+        ranking = "; ".join(["%s %s" % (format_choice(choice), score)
+                             for score, choice in result["ranking"]])
+        output.write(("  %s: %s (%s)\n" % (
+            result["method"], winners, ranking)).encode("utf-8"))
+
+
+def write_json(contest, output):
+    output.write(json.dumps(to_plain(contest), sort_keys=True) + "\n")
+
+
+def write_csv(contest, writer):
+    for result in contest["results"]:
+        for position, (score, choice) in enumerate(result["ranking"]):
+            writer.writerow([
+                unicode(item).encode("utf-8") for item in (
+                    contest["contest"], result["method"], position + 1,
+                    format_choice(choice), score)])
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog="ballotbox", description="Count contests with voting methods.")
+    parser.add_argument(
+        "inputs", nargs="*", default=["-"], metavar="INPUT",
+        help="a file of ballots for each contest, or - for standard input")
+    parser.add_argument(
+        "-m", "--method", action="append", dest="methods", metavar="METHOD",
+        help="a method to count with, as NAME[(ARG=VALUE,...)]"
+             "[:ARG=VALUE,...] (may be given more than once)")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=1,
+        help="the number of processes to count contests in")
+    parser.add_argument(
+        "-f", "--format", choices=["text", "json", "csv"], default="text",
+        help="the output format")
+    return parser
+
+
+def main(argv=None, stdin=None, output=None):
+    parser = get_parser()
+    options = parser.parse_args(argv)
+    output = output or sys.stdout
+    specs = options.methods or ["FirstPastPostVoting"]
+    try:
+        for spec in specs:
+            parse_method(spec)
+    except ValueError as error:
+        parser.error(str(error))
+    writer = None
+    if options.format == "csv":
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(["contest", "method", "position", "choice", "score"])
+    for contest in count_contests(
+            options.inputs, specs, options.workers, stdin):
+        if options.format == "json":
+            write_json(contest, output)
+        elif options.format == "csv":
+            write_csv(contest, writer)
+        else:
+            write_text(contest, output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Folding ballot streams into unique ballots and counts.
+
+Ranked elections have far fewer distinct ballots than voters, so counting
+work is cut by folding a stream of raw ballots into (unique ballot, count)
+form before it reaches a ballot box. Ballots are folded on a canonical key:
+the same preferences give the same key, whatever order a dict was built in,
+and the key is hashed by a dict lookup, without encoding it as JSON.
+"""
+from ballotbox.storage import BallotFile, write_ballots
+
+
+def get_canonical_key(vote):
+    """
+    Return a hashable key which is the same for equal ballots: the candidate,
+    for a plurality vote, or a sorted tuple of the candidates marked, or of
+    the (candidate, rank) pairs of a ballot of preferences.
+    """
+    if isinstance(vote, dict):
+        return tuple(sorted(vote.items()))
+    if isinstance(vote, list):
+        return ("",) + tuple(sorted(vote))
+    return vote
+
+
+class CompactedBallots(object):
+    """
+    The unique ballots of a stream, with the number of votes cast with each.
+
+    Each unique ballot is kept as it was first seen; 'record_count' is the
+    number of records folded into them, so that 'compression_ratio' gives
+    how many records each unique ballot stands for.
+    """
+    def __init__(self, ballots=()):
+        self.ballots = {}
+        self.record_count = 0
+        self.total_votes = 0
+        self.update(ballots)
+
+    def add(self, vote, count=1):
+        key = get_canonical_key(vote)
+        if key in self.ballots:
+            self.ballots[key][1] += count
+        else:
+            self.ballots[key] = [vote, count]
+        self.record_count += 1
+        self.total_votes += count
+
+    def update(self, ballots):
+        """
+        Fold a list of (vote, count) tuples in.
+        """
+        for vote, count in ballots:
+            self.add(vote, count)
+
+    def merge(self, other):
+        """
+        Fold in the ballots of another CompactedBallots, keeping the number of
+        records that went into both.
+        """
+        for key, (vote, count) in other.ballots.items():
+            if key in self.ballots:
+                self.ballots[key][1] += count
+            else:
+                self.ballots[key] = [vote, count]
+        self.record_count += other.record_count
+        self.total_votes += other.total_votes
+
+    def __len__(self):
+        return len(self.ballots)
+
+    @property
+    def compression_ratio(self):
+        if not self.ballots:
+            return None
+        return self.record_count / float(len(self.ballots))
+
+    def items(self):
+        """
+        Return the unique ballots as a list of (vote, count) tuples, most
+        votes first.
+        """
+        ballots = sorted([(-count, key, vote)
+                          for key, (vote, count) in self.ballots.items()])
+        return [(vote, -count) for count, key, vote in ballots]
+
+    def fill(self, ballotbox):
+        """
+        Add the ballots to a ballot box, with one call of add_votes for each
+        unique ballot.
+        """
+        for vote, count in self.items():
+            ballotbox.add_votes(vote, count)
+        return ballotbox
+
+    def write(self, path, candidates=None):
+        """
+        Write the unique ballots to a ballot file (see ballotbox.storage).
+        """
+        return write_ballots(path, self.items(), candidates)
+
+
+def compact(votes):
+    """
+    Fold a stream of single votes, one per voter, into CompactedBallots.
+    """
+    compacted = CompactedBallots()
+    for vote in votes:
+        compacted.add(vote)
+    return compacted
+
+
+def read_compacted(path):
+    """
+    Read the ballots of a ballot file into CompactedBallots.
+    """
+    ballot_file = BallotFile(path)
+    try:
+        return CompactedBallots(ballot_file.iteritems())
+    finally:
+        ballot_file.close()
+
+
+def merge_files(paths, path):
+    """
+    Merge the ballot files at 'paths', such as the compacted ballots of each
+    polling place, into one compacted file at 'path', returning its
+    CompactedBallots.
+    """
+    compacted = CompactedBallots()
+    for source in paths:
+        compacted.merge(read_compacted(source))
+    compacted.write(path)
+    return compacted
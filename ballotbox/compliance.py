@@ -0,0 +1,400 @@
+"""
+Checking voting methods against the criteria they claim to satisfy.
+
+Each voting method declares the criteria of ballotbox.criteria that it
+complies with. The checks below count a method on an election (a profile of
+ranked ballots, as made by ballotbox.generators) and on changed copies of it
+-- the winner raised on some ballots, a clone of a candidate added, a losing
+candidate dropped, the ballots reversed -- and report each case where the
+outcome contradicts a declared criterion.
+
+The changed elections are built from the tally of the original one: the
+pairwise counts of a copy are derived from the original counts for the
+ballots that changed, rather than counted again, and a copy is shared by
+every method that needs it. Only elections with a unique winner are checked.
+"""
+import itertools
+from collections import namedtuple
+
+from ballotbox.criteria import (
+    ICondorcetCriterion, ICondorcetLoserCriterion,
+    IIndependenceOfClonesCriterion,
+    IIndependenceOfIrrelevantAlternativesCriterion, IMajorityCriterion,
+    IMajorityLoserCriterion, IMonotonicityCriterion, IParticipationCriterion,
+    IReversalSymmetryCriterion)
+from ballotbox.tally import Tally, get_pair, get_winning_candidate
+
+
+Violation = namedtuple("Violation", "method criterion profile detail")
+
+
+def get_condorcet_winner(tally, reverse=False):
+    """
+    Return the candidate that beats (or with 'reverse', loses to) every other
+    candidate pairwise, if there is one.
+    """
+    pairwise = tally.pairwise
+    for candidate in tally.candidates:
+        for other in tally.candidates:
+            if other == candidate:
+                continue
+            wins = get_pair(pairwise, candidate, other)
+            losses = get_pair(pairwise, other, candidate)
+            if reverse:
+                wins, losses = losses, wins
+            if wins <= losses:
+                break
+        else:
+            return candidate
+
+
+def get_last_preferences(tally):
+    """
+    Return a dict mapping each candidate to the number of votes ranking them
+    last.
+    """
+    counts = {}
+    for preferences, votes in tally.ballots:
+        last = max(preferences.values())
+        for candidate, rank in preferences.items():
+            if rank == last:
+                counts[candidate] = counts.get(candidate, 0) + votes
+    return counts
+
+
+def get_better_candidate(preferences, candidate):
+    """
+    Return the candidate ranked just above 'candidate' on a ballot, or None if
+    they are ranked first.
+    """
+    rank = preferences[candidate]
+    above = [(other_rank, other)
+             for other, other_rank in preferences.items() if other_rank < rank]
+    if above:
+        return max(above)[1]
+
+
+def prefers(preferences, candidate1, candidate2):
+    """
+    Check whether a ballot ranks candidate1 above candidate2; unranked
+    candidates come last.
+    """
+    last = max(preferences.values()) + 1
+    return preferences.get(candidate1, last) < preferences.get(candidate2, last)
+
+
+class ProfileChecker(object):
+    """
+    The election being checked, with its tally, the winner of each method and
+    the changed copies of the election made so far.
+    """
+    def __init__(self, profile):
+        self.tally = Tally(ballots=profile)
+        self.tallies = {}
+        self.winners = {}
+
+    def get_winner(self, method, key=None):
+        """
+        Return the winner of the original election (or of the copy saved
+        under 'key') when counted with the given method.
+        """
+        if (id(method), key) not in self.winners:
+            tally = self.tally
+            if key is not None:
+                tally = self.tallies[key]
+            self.winners[id(method), key] = get_winning_candidate(
+                tally.get_winner(method))
+        return self.winners[id(method), key]
+
+    def get_changed_winner(self, method, key, factory, *args):
+        """
+        Return the winner of the copy of the election saved under 'key', which
+        is made with factory(*args) the first time any method needs it.
+        """
+        if key not in self.tallies:
+            self.tallies[key] = factory(*args)
+        return self.get_winner(method, key)
+
+    def raise_candidate(self, index, candidate):
+        """
+        Swap the candidate with the one ranked just above them on the ballots
+        at 'index' of the profile. Where either of them shares their rank,
+        the candidate is raised to level with the one above instead, leaving
+        the order of the others as it was.
+        """
+        preferences, votes = self.tally.ballots[index]
+        better = get_better_candidate(preferences, candidate)
+        raised = dict(preferences)
+        ranks = preferences.values()
+        if (ranks.count(preferences[candidate]) == 1 and
+                ranks.count(preferences[better]) == 1):
+            raised[better] = preferences[candidate]
+        raised[candidate] = preferences[better]
+        return self.tally.perturb(
+            removed=[(preferences, votes)], added=[(raised, votes)])
+
+    def add_ballots(self, index):
+        """
+        Add as many ballots again as there are at 'index' of the profile.
+        """
+        return self.tally.perturb(added=[self.tally.ballots[index]])
+
+    def add_clone(self, candidate, clone):
+        """
+        Rank a clone of the candidate just below them on every ballot, or
+        level with them on ballots where they share their rank.
+        """
+        ballots = []
+        above = level = 0
+        for preferences, votes in self.tally.ballots:
+            rank = preferences.get(candidate)
+            if rank is None:
+                ballots.append((preferences, votes))
+                continue
+            if preferences.values().count(rank) > 1:
+                new_preferences = dict(preferences)
+                new_preferences[clone] = rank
+                level += votes
+            else:
+                new_preferences = {clone: rank + 1}
+                for other, other_rank in preferences.items():
+                    if other_rank > rank:
+                        other_rank += 1
+                    new_preferences[other] = other_rank
+                above += votes
+            ballots.append((new_preferences, votes))
+        pairwise = dict(self.tally.pairwise)
+        for other in self.tally.candidates:
+            if other == candidate:
+                continue
+            for template in ("%s > %s", "%s = %s"):
+                for key, clone_key in (
+                        (template % (candidate, other),
+                         template % (clone, other)),
+                        (template % (other, candidate),
+                         template % (other, clone))):
+                    if key in pairwise:
+                        pairwise[clone_key] = pairwise[key]
+        if above:
+            pairwise["%s > %s" % (candidate, clone)] = above
+        if level:
+            pairwise["%s = %s" % (candidate, clone)] = level
+        return Tally(ballots=ballots, pairwise=pairwise)
+
+    def drop_candidate(self, candidate):
+        """
+        Take the candidate off every ballot.
+        """
+        ballots = []
+        for preferences, votes in self.tally.ballots:
+            rank = preferences.get(candidate)
+            if rank is None:
+                ballots.append((preferences, votes))
+                continue
+            new_preferences = {}
+            for other, other_rank in preferences.items():
+                if other == candidate:
+                    continue
+                if other_rank > rank:
+                    other_rank -= 1
+                new_preferences[other] = other_rank
+            if new_preferences:
+                ballots.append((new_preferences, votes))
+        pairwise = dict(self.tally.pairwise)
+        for other in self.tally.candidates:
+            for key in ("%s > %s" % (candidate, other),
+                        "%s > %s" % (other, candidate),
+                        "%s = %s" % (candidate, other),
+                        "%s = %s" % (other, candidate)):
+                pairwise.pop(key, None)
+        return Tally(ballots=ballots, pairwise=pairwise)
+
+    def reverse(self):
+        """
+        Reverse the order of the candidates on every ballot.
+        """
+        ballots = []
+        for preferences, votes in self.tally.ballots:
+            last = max(preferences.values()) + 1
+            ballots.append((
+                dict([(candidate, last - rank)
+                      for candidate, rank in preferences.items()]),
+                votes))
+        pairwise = dict(self.tally.pairwise)
+        for candidate1, candidate2 in itertools.permutations(
+                self.tally.candidates, 2):
+            key = "%s > %s" % (candidate1, candidate2)
+            if key in self.tally.pairwise:
+                pairwise["%s > %s" % (candidate2, candidate1)] = (
+                    self.tally.pairwise[key])
+            else:
+                pairwise.pop("%s > %s" % (candidate2, candidate1), None)
+        return Tally(ballots=ballots, pairwise=pairwise)
+
+
+def check_majority(checker, method, winner):
+    tally = checker.tally
+    for candidate, votes in tally.first_preferences.items():
+        if 2 * votes > tally.total_votes and candidate != winner:
+            yield "%s is ranked first by a majority, but %s wins" % (
+                candidate, winner)
+
+
+def check_majority_loser(checker, method, winner):
+    votes = get_last_preferences(checker.tally).get(winner, 0)
+    if 2 * votes > checker.tally.total_votes:
+        yield "%s is ranked last by a majority, but wins" % winner
+
+
+def check_condorcet(checker, method, winner):
+    candidate = get_condorcet_winner(checker.tally)
+    if candidate is not None and candidate != winner:
+        yield "%s is the Condorcet winner, but %s wins" % (candidate, winner)
+
+
+def check_condorcet_loser(checker, method, winner):
+    if get_condorcet_winner(checker.tally, reverse=True) == winner:
+        yield "%s is the Condorcet loser, but wins" % winner
+
+
+def check_monotonicity(checker, method, winner):
+    for index, (preferences, votes) in enumerate(checker.tally.ballots):
+        if get_better_candidate(preferences, winner) is None:
+            continue
+        new_winner = checker.get_changed_winner(
+            method, ("raise", index, winner), checker.raise_candidate,
+            index, winner)
+        if new_winner not in (None, winner):
+            yield "raising %s on %s ballots %r makes %s win" % (
+                winner, votes, preferences, new_winner)
+
+
+def check_participation(checker, method, winner):
+    for index, (preferences, votes) in enumerate(checker.tally.ballots):
+        new_winner = checker.get_changed_winner(
+            method, ("add", index), checker.add_ballots, index)
+        if new_winner is None or new_winner == winner:
+            continue
+        if prefers(preferences, winner, new_winner):
+            yield "adding %s ballots %r makes %s win" % (
+                votes, preferences, new_winner)
+
+
+def check_independence_of_irrelevant_alternatives(checker, method, winner):
+    for candidate in checker.tally.candidates:
+        if candidate == winner:
+            continue
+        new_winner = checker.get_changed_winner(
+            method, ("drop", candidate), checker.drop_candidate, candidate)
+        if new_winner not in (None, winner):
+            yield "dropping %s makes %s win" % (candidate, new_winner)
+
+
+def check_independence_of_clones(checker, method, winner):
+    for candidate in checker.tally.candidates:
+        clone = "%s'" % candidate
+        if clone in checker.tally.histogram:
+            continue
+        new_winner = checker.get_changed_winner(
+            method, ("clone", candidate), checker.add_clone, candidate,
+            clone)
+        if new_winner is None:
+            continue
+        if candidate == winner and new_winner in (winner, clone):
+            continue
+        if new_winner != winner:
+            yield "adding a clone of %s makes %s win" % (
+                candidate, new_winner)
+
+
+def check_reversal_symmetry(checker, method, winner):
+    if len(checker.tally.candidates) < 2:
+        return
+    new_winner = checker.get_changed_winner(
+        method, ("reverse",), checker.reverse)
+    if new_winner == winner:
+        yield "%s wins with the ballots reversed, too" % winner
+
+
+checks = [
+    (IMajorityCriterion, check_majority),
+    (IMajorityLoserCriterion, check_majority_loser),
+    (ICondorcetCriterion, check_condorcet),
+    (ICondorcetLoserCriterion, check_condorcet_loser),
+    (IMonotonicityCriterion, check_monotonicity),
+    (IParticipationCriterion, check_participation),
+    (IIndependenceOfIrrelevantAlternativesCriterion,
+     check_independence_of_irrelevant_alternatives),
+    (IIndependenceOfClonesCriterion, check_independence_of_clones),
+    (IReversalSymmetryCriterion, check_reversal_symmetry),
+    ]
+
+
+def check_profile(methods, profile):
+    """
+    Check each method against the criteria it declares on a single profile,
+    returning a list of (method index, criterion, detail) tuples.
+    """
+    checker = ProfileChecker(profile)
+    found = []
+    for method_index, method in enumerate(methods):
+        winner = checker.get_winner(method)
+        if winner is None:
+            continue
+        for criterion, check in checks:
+            if not criterion.providedBy(method):
+                continue
+            for detail in check(checker, method, winner):
+                found.append((method_index, criterion, detail))
+    return found
+
+
+# the methods being checked by a worker process, set when the worker starts
+# so that they are not sent along with every profile
+_methods = None
+
+
+def _set_methods(methods):
+    global _methods
+    _methods = methods
+
+
+def _check_profile(profile):
+    return profile, check_profile(_methods, profile)
+
+
+def check_compliance(methods, profiles, processes=None, chunksize=16):
+    """
+    Check each of the given methods against the criteria it declares on every
+    profile, returning a list of Violation tuples, in the order of the
+    profiles.
+
+    The methods are instances (of IVotingMethod providers) that are counted
+    without any arguments for get_winner. The profiles may be any iterable,
+    such as a generator from ballotbox.generators.get_profiles; they are
+    checked in 'processes' worker processes (by default, one for each CPU),
+    'chunksize' profiles at a time. With 'processes' set to 1, the profiles
+    are checked in this process.
+    """
+    methods = list(methods)
+    pool = None
+    if processes == 1:
+        results = itertools.imap(
+            lambda profile: (profile, check_profile(methods, profile)),
+            profiles)
+    else:
+        # imported only when there are workers to start
+        import multiprocessing
+        pool = multiprocessing.Pool(processes, _set_methods, (methods,))
+        results = pool.imap(_check_profile, profiles, chunksize)
+    violations = []
+    try:
+        for profile, found in results:
+            for method_index, criterion, detail in found:
+                violations.append(Violation(
+                    methods[method_index], criterion, profile, detail))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return violations
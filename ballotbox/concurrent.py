@@ -0,0 +1,118 @@
+"""
+A ballot box for many threads adding votes at once.
+
+Adding a vote to a BallotBox reads the count for the ballot and writes it
+back, so threads adding votes to the same box can lose each other's votes,
+while one lock around the box makes every thread wait for the others. A
+ConcurrentBallotBox instead gives each thread its own counts, each with its
+own lock, which only that thread takes while adding votes; counting merges
+the counts of every thread into a BallotBox, taking each thread's lock in
+turn while its counts are copied. No vote is lost or counted twice, and
+threads adding votes never wait for each other.
+"""
+import threading
+
+from zope.interface import implements
+
+from ballotbox.ballot import BallotBox
+from ballotbox.iballot import IBallotBox
+
+
+class Shard(object):
+    """
+    The counts of the votes added by one thread, keyed as a BallotBox keys
+    them.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+
+
+class ConcurrentBallotBox(object):
+    """
+    A ballot box which threads can add votes to at once, answering
+    everything else from a BallotBox of the votes added so far.
+    """
+    implements(IBallotBox)
+
+    def __init__(self, method=None, *args, **kwargs):
+        if method:
+            method = method(*args, **kwargs)
+        self.method = method
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        # used for encoding the votes the same way as the merged box does
+        self._encoder = BallotBox()
+
+    def _get_shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def add_vote(self, vote):
+        self.add_votes(vote, 1)
+
+    def add_votes(self, vote, count):
+        key = self._encoder._encode(vote)
+        shard = self._get_shard()
+        with shard.lock:
+            shard.counts[key] = shard.counts.get(key, 0) + count
+
+    def batch_votes(self, votes):
+        shard = self._get_shard()
+        encode = self._encoder._encode
+        votes = [(encode(vote), count) for vote, count in votes]
+        with shard.lock:
+            for key, count in votes:
+                shard.counts[key] = shard.counts.get(key, 0) + count
+
+    def snapshot(self):
+        """
+        Return a BallotBox of every vote added so far, with this box's method.
+        """
+        with self._shards_lock:
+            shards = list(self._shards)
+        counts = {}
+        for shard in shards:
+            with shard.lock:
+                items = shard.counts.items()
+            for key, count in items:
+                counts[key] = counts.get(key, 0) + count
+        ballotbox = BallotBox()
+        ballotbox.method = self.method
+        # the keys are already encoded, so they are set as they are
+        for key, count in counts.items():
+            ballotbox[key] = count
+        return ballotbox
+
+    def get_total_votes(self):
+        total = 0
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            with shard.lock:
+                total += sum(shard.counts.values())
+        return total
+
+    def get_winner(self, *args, **kwargs):
+        return self.snapshot().get_winner(*args, **kwargs)
+
+    def get_histogram(self):
+        return self.snapshot().get_histogram()
+
+    def get_candidates(self):
+        return self.snapshot().get_candidates()
+
+    def get_tally(self):
+        return self.snapshot().get_tally()
+
+    def get_margin(self, *args, **kwargs):
+        return self.snapshot().get_margin(*args, **kwargs)
+
+    def evaluate(self, methods):
+        return self.snapshot().evaluate(methods)
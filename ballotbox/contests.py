@@ -0,0 +1,123 @@
+"""
+Counting many contests at once.
+
+A general election has a contest for every office in every district, and
+making a ballot box and a method for each of them costs more than counting
+them. Contests takes a stream of (contest_id, vote) records, or (contest_id,
+vote, count) records, in one pass, folding each contest's votes into its
+unique ballots (see ballotbox.compaction) as they come. Each contest is then
+counted from a tally of its unique ballots, with the same method instances
+for every contest, in worker processes; the results are given in a dict
+keyed by contest.
+"""
+from ballotbox.compaction import CompactedBallots
+from ballotbox.tally import Tally
+
+
+def count_contest(methods, ballots):
+    """
+    Count a contest's (vote, count) tuples with each of the given methods,
+    returning a list of their results in the same order.
+    """
+    return Tally(ballots=ballots).evaluate(methods)
+
+
+# the methods being counted with by a worker process, set when the worker
+# starts so that they are not sent along with every contest
+_methods = None
+
+
+def _set_methods(methods):
+    global _methods
+    _methods = methods
+
+
+def get_contest_methods(methods, contest_id):
+    if isinstance(methods, dict):
+        return methods[contest_id]
+    return methods
+
+
+def _count_contest(contest):
+    contest_id, ballots = contest
+    return contest_id, count_contest(
+        get_contest_methods(_methods, contest_id), ballots)
+
+
+class Contests(object):
+    """
+    The unique ballots of many contests, keyed by contest.
+    """
+    def __init__(self, records=()):
+        self.contests = {}
+        self.update(records)
+
+    def add(self, contest_id, vote, count=1):
+        compacted = self.contests.get(contest_id)
+        if compacted is None:
+            compacted = self.contests[contest_id] = CompactedBallots()
+        compacted.add(vote, count)
+
+    def update(self, records):
+        """
+        Fold in (contest_id, vote) or (contest_id, vote, count) records.
+        """
+        for record in records:
+            self.add(*record)
+
+    def __len__(self):
+        return len(self.contests)
+
+    def __contains__(self, contest_id):
+        return contest_id in self.contests
+
+    def __getitem__(self, contest_id):
+        return self.contests[contest_id]
+
+    def get_contest_ids(self):
+        return sorted(self.contests.keys())
+
+    def get_tally(self, contest_id):
+        return Tally(ballots=self.contests[contest_id].items())
+
+    def evaluate(self, methods, processes=None, chunksize=16):
+        """
+        Count every contest, returning a dict mapping each contest to a list
+        of the results of each method, in the same order.
+
+        Each item of 'methods' is either an IVotingMethod provider or a
+        (method, kwargs) tuple, as for BallotBox.evaluate; 'methods' may
+        instead be a dict mapping each contest to its own list of them. The
+        contests are counted in 'processes' worker processes (by default,
+        one for each CPU), 'chunksize' contests at a time. With 'processes'
+        set to 1, they are counted in this process.
+        """
+        if isinstance(methods, dict):
+            methods = dict([(contest_id, list(contest_methods))
+                            for contest_id, contest_methods in methods.items()])
+        else:
+            methods = list(methods)
+        contests = [(contest_id, self.contests[contest_id].items())
+                    for contest_id in self.get_contest_ids()]
+        if processes == 1:
+            return dict([
+                (contest_id, count_contest(
+                    get_contest_methods(methods, contest_id), ballots))
+                for contest_id, ballots in contests])
+        # imported only when there are workers to start
+        import multiprocessing
+        pool = multiprocessing.Pool(processes, _set_methods, (methods,))
+        try:
+            return dict(pool.imap(_count_contest, contests, chunksize))
+        finally:
+            pool.close()
+            pool.join()
+
+
+def count_contests(records, methods, processes=None, chunksize=16):
+    """
+    Count the contests of a stream of (contest_id, vote) or (contest_id,
+    vote, count) records, returning a dict mapping each contest to a list of
+    the results of each method (see Contests.evaluate).
+    """
+    return Contests(records).evaluate(methods, processes, chunksize)
@@ -0,0 +1,52 @@
+"""
+Models for generating random elections.
+
+Each model is a function taking a list of candidates, the number of voters and
+a random.Random instance, and returning a profile: a list of (preferences,
+count) tuples, where 'preferences' is a dict ranking every candidate (1 being
+the first choice) and 'count' is the number of voters casting that ballot.
+Profiles can be given to BallotBox.batch_votes as they are.
+"""
+from __future__ import absolute_import
+
+import random
+
+
+def get_profile(rankings):
+    """
+    Group a list of rankings (each a list of candidates, best first) into a
+    profile.
+    """
+    counts = {}
+    for ranking in rankings:
+        ranking = tuple(ranking)
+        counts[ranking] = counts.get(ranking, 0) + 1
+    profile = []
+    for ranking, count in sorted(counts.items()):
+        preferences = dict([
+            (candidate, rank + 1) for rank, candidate in enumerate(ranking)])
+        profile.append((preferences, count))
+    return profile
+
+
+def impartial_culture(candidates, voter_count, random):
+    """
+    Every voter picks one of the possible rankings of the candidates, each
+    ranking being equally likely.
+    """
+    rankings = []
+    for voter in xrange(voter_count):
+        ranking = list(candidates)
+        random.shuffle(ranking)
+        rankings.append(ranking)
+    return get_profile(rankings)
+
+
+def get_profiles(model, candidates, voter_count, profile_count, seed=None):
+    """
+    Generate 'profile_count' profiles from the given model. The same seed
+    always gives the same profiles.
+    """
+    generator = random.Random(seed)
+    for index in xrange(profile_count):
+        yield model(candidates, voter_count, generator)
@@ -42,6 +42,39 @@ class IBallotBox(Interface):
         implementation class.
         """
 
+    def get_histogram(self):
+        """
+        Return a dict mapping each candidate to a dict of the number of votes
+        giving them each rank. Plurality votes rank their candidate first.
+        """
+
+    def get_candidates(self):
+        """
+        Return a sorted list of every candidate on any ballot, from an index
+        kept up to date as votes are added.
+        """
+
+    def get_tally(self):
+        """
+        Decode the ballots once and return an ITally provider for them.
+        """
+
+    def get_margin(self, *args, **kwargs):
+        """
+        Return the margin of victory of the count, for voting methods which
+        provide IMarginVotingMethod.
+        """
+
+    def evaluate(self, methods):
+        """
+        Count the ballots with several voting methods, sharing one tally
+        between them.
+
+        Each item of 'methods' is either an IVotingMethod provider or a
+        (method, kwargs) tuple. Returns a list of the results of each method,
+        in the same order.
+        """
+
 
 class IVotingMethod(Interface):
     """
@@ -52,4 +85,126 @@ class IVotingMethod(Interface):
         return a list of winners (a list that may only have one element most of
         the times), where each element of that list is a two-tuple:
             (vote_count, candidate)
+
+        Methods which score every candidate return an IResults provider,
+        which is such a list that also carries the full tally.
+        """
+
+
+class ITallyVotingMethod(IVotingMethod):
+    """
+    A voting method that can be counted from the statistics of a tally
+    instead of from the ballots.
+    """
+    def get_tally_winner(self, tally):
+        """
+        Return what get_winner would for the ballot box the tally was built
+        from.
+        """
+
+
+class IMarginVotingMethod(ITallyVotingMethod):
+    """
+    A voting method that can find the margin of victory of a count from a
+    tally.
+    """
+    def get_tally_margin(self, tally):
+        """
+        Return a (lower, upper) tuple of bounds on the fewest ballots that
+        must be changed for a different candidate to tie with or beat the
+        winner (see ballotbox.margins), or None if there is no other
+        candidate.
+        """
+
+
+class ITally(Interface):
+    """
+    The decoded ballots of a ballot box, and the statistics that voting
+    methods are counted from.
+    """
+    ballotbox = Attribute("The ballot box the tally was built from")
+    ballots = Attribute("A list of (vote, count) tuples, already decoded")
+    candidates = Attribute("A sorted list of every candidate on any ballot")
+    total_votes = Attribute("The number of votes cast")
+    first_preferences = Attribute(
+        "A dict mapping each candidate to the number of votes ranking them "
+        "first")
+    histogram = Attribute(
+        "A dict mapping each candidate to a dict of the number of votes "
+        "giving them each rank")
+    pairwise = Attribute(
+        "A dict mapping 'A > B' to the number of votes preferring A to B")
+
+    def get_histogram(self):
+        """
+        Return the histogram, as IBallotBox.get_histogram does.
+        """
+
+    def get_candidates(self):
+        """
+        Return the candidates, as IBallotBox.get_candidates does.
+        """
+
+    def get_winner(self, method, *args, **kwargs):
+        """
+        Count the tally with the given IVotingMethod provider.
+        """
+
+    def evaluate(self, methods):
+        """
+        Count the tally with each of the given methods, returning a list of
+        their results in the same order.
+        """
+
+    def get_margin(self, method, *args, **kwargs):
+        """
+        Return the margin of victory of the count with the given
+        IMarginVotingMethod provider.
+        """
+
+    def perturb(self, removed=(), added=()):
+        """
+        Return a new tally with the (vote, count) tuples in 'removed' taken
+        out and those in 'added' put in.
+        """
+
+
+class IResults(Interface):
+    """
+    The results returned by get_winner: a list of (score, candidate) tuples
+    for the winning positions, which also carries the score of every
+    candidate.
+    """
+    scores = Attribute("A dict mapping every candidate to their score")
+    position_count = Attribute(
+        "The number of positions filled; 0 if the count has no winner")
+    order = Attribute(
+        "None if candidates are ranked by their scores, otherwise a dict "
+        "mapping each candidate to the key they are ranked by")
+    ranking = Attribute(
+        "A list of (score, candidate) tuples for every candidate, best first")
+    tie_groups = Attribute(
+        "A list of lists of the candidates sharing a place, best first")
+    winners = Attribute(
+        "The candidates sharing first place, or an empty list if no "
+        "positions were filled")
+    winner = Attribute(
+        "The winning candidate, or None if there is a tie or no winner")
+    is_tied = Attribute("True if more than one candidate has the best score")
+    margins = Attribute(
+        "A list of (lead, candidate) tuples, one for every candidate but the "
+        "last in the ranking, where 'lead' is how far the candidate's score "
+        "is ahead of the next candidate's")
+    margin = Attribute(
+        "How far the best score is ahead of the second best, or None if "
+        "there are fewer than two candidates")
+
+    def top(self, count):
+        """
+        Return the (score, candidate) tuples of the first 'count' positions.
+        """
+
+    def get_margin(self, candidate1, candidate2):
+        """
+        Return how far candidate1's score is ahead of candidate2's.
         """
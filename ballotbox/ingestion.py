@@ -0,0 +1,133 @@
+"""
+Taking in votes from an event-driven service.
+
+A service taking votes over the network should not encode every vote and
+update a ballot box on its event loop. A BatchingBallotBox takes votes from
+producers as they arrive, returning Deferreds, and gathers them into batches,
+which are folded into unique ballots (see ballotbox.compaction) and added to
+the ballot box in a worker thread. A batch is sent when it is full or when
+the oldest vote in it has waited long enough, one batch at a time, so the
+ballot box only has one thread adding votes to it.
+
+Producers are held back when too many votes are waiting: past 'max_pending',
+the Deferred a producer gets for a vote only fires once a batch has been
+added and made room, and a producer which waits for it before sending more
+votes keeps the backlog bounded.
+
+A batch the ballot box fails to add is not lost: its votes are put back to
+be sent with the next batch, they are still waiting as far as producers are
+concerned, and the failure is given to the next flush() or checkpoint().
+"""
+from twisted.internet import defer, threads
+
+from ballotbox.compaction import CompactedBallots
+
+
+class BatchingBallotBox(object):
+    """
+    Votes for a ballot box, added in batches of up to 'batch_size' votes, or
+    of whatever votes are waiting 'interval' seconds after the first of them
+    came.
+
+    By default, batches are added in the reactor's thread pool; 'run' may be
+    given instead, as a function which calls a function with the given
+    arguments and returns a Deferred of its result.
+    """
+    def __init__(self, ballotbox, batch_size=1000, interval=0.1,
+                 max_pending=10000, reactor=None, run=None):
+        if reactor is None:
+            from twisted.internet import reactor
+        if run is None:
+            def run(function, *args):
+                return threads.deferToThreadPool(
+                    reactor, reactor.getThreadPool(), function, *args)
+        self.ballotbox = ballotbox
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.reactor = reactor
+        self.run = run
+        self.pending = 0
+        self._batch = []
+        self._timer = None
+        self._waiting = []
+        # the last failure to add a batch, for the next flush or checkpoint
+        self._failure = None
+        # batches are added one after another, each once the last is done
+        self._lock = defer.DeferredLock()
+
+    def add_vote(self, vote):
+        return self.add_votes(vote, 1)
+
+    def add_votes(self, vote, count):
+        """
+        Add a vote to the next batch, returning a Deferred which fires when
+        the producer may send more votes.
+        """
+        self._batch.append((vote, count))
+        self.pending += 1
+        if len(self._batch) >= self.batch_size:
+            self._send()
+        elif self._timer is None:
+            self._timer = self.reactor.callLater(self.interval, self._send)
+        if self.pending <= self.max_pending:
+            return defer.succeed(None)
+        waiting = defer.Deferred()
+        self._waiting.append(waiting)
+        return waiting
+
+    def _send(self):
+        if self._timer is not None:
+            if self._timer.active():
+                self._timer.cancel()
+            self._timer = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return self._lock.run(defer.succeed, None)
+        return self._lock.run(self._add_batch, batch)
+
+    def _add_batch(self, batch):
+        def added(result):
+            self.pending -= len(batch)
+            while self._waiting and self.pending <= self.max_pending:
+                self._waiting.pop(0).callback(None)
+            return result
+
+        def failed(failure):
+            # the votes are sent again with the next batch
+            self._batch[0:0] = batch
+            self._failure = failure
+        d = self.run(self._fill, batch)
+        d.addCallbacks(added, failed)
+        return d
+
+    def _check_failure(self, result):
+        failure, self._failure = self._failure, None
+        if failure is not None:
+            return failure
+        return result
+
+    def _fill(self, batch):
+        CompactedBallots(batch).fill(self.ballotbox)
+
+    def flush(self):
+        """
+        Send the votes waiting for a batch, returning a Deferred which fires
+        when every vote taken so far has been added to the ballot box, or
+        fails if a batch could not be added since the last flush.
+        """
+        return self._send().addCallback(self._check_failure)
+
+    def checkpoint(self):
+        """
+        Flush the votes taken so far, returning a Deferred which fires with a
+        tally of the ballot box made before any later batch is added, or
+        fails as flush() does.
+        """
+        flushed = self.flush()
+        # queued right after the flushed batch, ahead of any later one
+        d = self._lock.run(self.run, self.ballotbox.get_tally)
+        d = defer.gatherResults([flushed, d], consumeErrors=True)
+        d.addCallbacks(lambda results: results[1],
+                       lambda failure: failure.value.subFailure)
+        return d
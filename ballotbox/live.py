@@ -0,0 +1,149 @@
+"""
+Live results, kept up to date while votes are still being counted.
+
+A results display asks for the winner over and over while votes come in.
+LiveResults keeps a tally whose first preferences, rank histogram and
+pairwise counts are updated as each vote is added, and after every change
+counts each of its methods again from those statistics, never from the
+ballots, so asking for the results costs nothing. Subscribers are called
+only when a method's ranking of the candidates changes, not every time a
+score does.
+
+Methods which count from a tally (plurality, majority rule, Borda, Minimax,
+Copeland and the rest of the ITallyVotingMethod providers) are kept up to
+date this way. Any other method can only be counted from the ballots, so it
+is counted again when its results are asked for after a change.
+"""
+from ballotbox.compaction import get_canonical_key
+from ballotbox.iballot import ITallyVotingMethod
+from ballotbox.results import Results
+from ballotbox.tally import Tally, add_pairs, get_preferences
+
+
+def get_ranking(result):
+    """
+    Return what a result ranks, leaving out the scores: the winners and the
+    groups of tied candidates for Results, and otherwise the candidates (or
+    rankings, or pairs) listed.
+    """
+    if isinstance(result, Results):
+        return (tuple(result.winners),
+                tuple([tuple(group) for group in result.tie_groups]))
+    return tuple([item[1] for item in result])
+
+
+class LiveTally(Tally):
+    """
+    A tally which votes can be added to, keeping its pairwise counts up to
+    date once they have been built. Repeated ballots are folded together
+    (see ballotbox.compaction), so the tally grows with the number of
+    different ballots, not with the number of votes.
+
+    With an unranked tier, the pairwise counts of every pair depend on the
+    total votes and on how often each candidate is ranked, so they are
+    counted again when next needed rather than updated.
+    """
+    def __init__(self, *args, **kwargs):
+        # the position of each unique ballot in 'ballots'
+        self._positions = {}
+        super(LiveTally, self).__init__(*args, **kwargs)
+
+    def add_ballot(self, vote, votes):
+        key = get_canonical_key(vote)
+        position = self._positions.get(key)
+        if position is None:
+            self._positions[key] = len(self.ballots)
+            self.ballots.append((vote, votes))
+        else:
+            old_vote, old_votes = self.ballots[position]
+            self.ballots[position] = (old_vote, old_votes + votes)
+        self.count_ballot(vote, votes)
+        if self.unranked_tier:
+            self._pairwise = None
+        elif self._pairwise is not None:
+            add_pairs(self._pairwise, get_preferences(vote), votes)
+        candidates = getattr(self, "candidates", None)
+        if candidates is not None and len(candidates) < len(self.histogram):
+            # declared candidates are kept, whether or not any ballot ranks
+            # them
+            self.candidates = sorted(set(candidates) | set(self.histogram))
+        # the ballot box for methods counted from the ballots is made again
+        self._ballotbox = None
+
+
+class LiveResults(object):
+    """
+    The results of several methods, kept up to date as votes are added.
+
+    Each item of 'methods' is either an IVotingMethod provider or a (method,
+    kwargs) tuple, as for BallotBox.evaluate. Subscribers are called with the
+    index of the method, its old results and its new results.
+    """
+    def __init__(self, methods, ballots=()):
+        self.methods = []
+        for method in methods:
+            kwargs = {}
+            if isinstance(method, tuple):
+                method, kwargs = method
+            self.methods.append((method, kwargs))
+        self.tally = LiveTally(ballots=list(ballots))
+        self.subscribers = []
+        self._results = [None] * len(self.methods)
+        self._stale = set(range(len(self.methods)))
+        self._update()
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def add_vote(self, vote):
+        self.add_votes(vote, 1)
+
+    def add_votes(self, vote, count):
+        self.tally.add_ballot(vote, count)
+        self._stale = set(range(len(self.methods)))
+        self._update()
+
+    def batch_votes(self, votes):
+        """
+        Add several (vote, count) tuples, counting the methods again only
+        once they have all been added.
+        """
+        for vote, count in votes:
+            self.tally.add_ballot(vote, count)
+        self._stale = set(range(len(self.methods)))
+        self._update()
+
+    def _count(self, index):
+        method, kwargs = self.methods[index]
+        old = self._results[index]
+        new = self.tally.get_winner(method, **kwargs)
+        self._results[index] = new
+        self._stale.discard(index)
+        if old is None or get_ranking(old) != get_ranking(new):
+            for callback in list(self.subscribers):
+                callback(index, old, new)
+        return new
+
+    def _update(self):
+        for index, (method, kwargs) in enumerate(self.methods):
+            if ITallyVotingMethod.providedBy(method):
+                self._count(index)
+
+    def get_results(self, index):
+        """
+        Return the current results of the method at 'index'.
+        """
+        if index in self._stale:
+            return self._count(index)
+        return self._results[index]
+
+    def refresh(self):
+        """
+        Count any method which could not be kept up to date, calling the
+        subscribers if its ranking changed.
+        """
+        for index in sorted(self._stale):
+            self._count(index)
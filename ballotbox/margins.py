@@ -0,0 +1,122 @@
+"""
+Margins of victory.
+
+The margin of an election is the smallest number of ballots that would have
+to be changed (each replaced with any other ballot) for a different candidate
+to tie with or beat the winner. Risk-limiting audits and recount rules depend
+on it.
+
+Every margin is given as a (lower, upper) tuple of bounds, which are equal
+when the margin is known exactly: it is for plurality, majority rule and the
+Borda count, while only bounds are found for the Condorcet methods. A tied
+count has a margin of (0, 0). All of them are computed from a tally of the
+ballots; nothing is counted again.
+"""
+from ballotbox.tally import get_pair, get_winning_candidate
+
+
+def get_plurality_margin(counts):
+    """
+    Return the margin of a plurality count, given a dict mapping each
+    candidate to their votes: every changed ballot takes a vote from the
+    winner and gives it to the runner-up, closing the gap by two.
+    """
+    ranking = sorted(
+        [(votes, candidate) for candidate, votes in counts.items()],
+        reverse=True)
+    if len(ranking) < 2:
+        return None
+    (winner_votes, winner), (runner_up_votes, runner_up) = ranking[0:2]
+    margin = (winner_votes - runner_up_votes + 1) // 2
+    return margin, margin
+
+
+def get_majority_margin(counts, total_votes):
+    """
+    Return the margin of a majority count: the changes needed to take the
+    winner's majority away, or, if there is no winner, to give the leading
+    candidate a majority.
+    """
+    if not counts or not total_votes:
+        return None
+    leader = max(counts.values())
+    if 2 * leader > total_votes:
+        margin = leader - total_votes // 2
+    else:
+        margin = total_votes // 2 + 1 - leader
+    return margin, margin
+
+
+def get_points_margin(ballots, winner, challenger, lead, best_gain,
+                      get_ballot_points):
+    """
+    Return the fewest ballots that must change for the challenger to catch
+    up with a winner 'lead' points ahead, or None if they cannot.
+
+    Changing a ballot loses the winner's lead what the ballot gave the winner
+    over the challenger, plus 'best_gain', the most a new ballot can give the
+    challenger over the winner. Changing the ballots with the largest gains
+    first is optimal, since the gains do not depend on each other.
+    """
+    gains = []
+    for preferences, votes in ballots:
+        points = get_ballot_points(preferences)
+        gain = points.get(winner, 0) - points.get(challenger, 0) + best_gain
+        if gain > 0:
+            gains.append((gain, votes))
+    gains.sort(reverse=True)
+    changed = 0
+    for gain, votes in gains:
+        needed = int(-(-lead // gain))
+        if needed <= votes:
+            return changed + needed
+        changed += votes
+        lead -= gain * votes
+    return None
+
+
+def get_condorcet_margin(tally, winner):
+    """
+    Return bounds on the margin of a Condorcet method from the pairwise
+    counts.
+
+    While the winner beats every other candidate pairwise, a Condorcet method
+    must elect them, so at least enough ballots to undo the winner's closest
+    pairwise win must change (each changed ballot moves a pairwise count by
+    at most two). At most, enough ballots must change, to put a challenger
+    first, for the challenger to beat every other candidate pairwise.
+    """
+    pairwise = tally.pairwise
+    others = [candidate for candidate in tally.candidates
+              if candidate != winner]
+    if not others:
+        return None
+    leads = [get_pair(pairwise, winner, other) -
+             get_pair(pairwise, other, winner) for other in others]
+    if min(leads) > 0:
+        lower = min([(lead + 1) // 2 for lead in leads])
+    else:
+        lower = 1
+    upper = tally.total_votes
+    for challenger in others:
+        needed = 0
+        for other in tally.candidates:
+            if other == challenger:
+                continue
+            deficit = (get_pair(pairwise, other, challenger) -
+                       get_pair(pairwise, challenger, other))
+            if deficit >= 0:
+                needed += deficit // 2 + 1
+        upper = min(upper, needed)
+    return lower, max(lower, upper)
+
+
+def get_pairwise_margin(method, tally):
+    """
+    Count a tally with a Condorcet method and return bounds on its margin
+    from the pairwise counts.
+    """
+    winner = get_winning_candidate(method.get_tally_winner(tally))
+    if winner is None:
+        return 0, 0
+    return get_condorcet_margin(tally, winner)
@@ -0,0 +1,96 @@
+"""
+Majoritarian multi-winner methods let the largest group of voters fill every
+seat in a district; the most popular candidates take all of the positions, in
+the same way that the plurality winner takes the single seat in a
+first-past-the-post election.
+
+The ballots used by the methods below are multi-mark: each vote is a list of
+the candidates the voter has marked. A plain candidate name is treated as a
+single mark.
+"""
+from zope.interface import implements
+
+from ballotbox.criteria import IMonotonicityCriterion
+from ballotbox.iballot import IVotingMethod
+from ballotbox.results import Results
+
+
+class MultiMarkBase(object):
+    """
+    This is a base class to hold common code for implementations that count
+    multi-mark ballots.
+    """
+    def get_marks(self, vote):
+        """
+        Return the set of candidates marked on a ballot.
+        """
+        if isinstance(vote, list):
+            return set(vote)
+        return set([vote])
+
+    def get_mark_limit(self, position_count):
+        """
+        Return the largest number of marks a valid ballot may have; ballots
+        with more marks than this are spoiled and not counted.
+        """
+        return position_count
+
+    def get_counts(self, ballotbox, position_count):
+        limit = self.get_mark_limit(position_count)
+        totals = {}
+        for vote, votes in ballotbox.items():
+            marks = self.get_marks(vote)
+            if len(marks) > limit:
+                continue
+            for candidate in marks:
+                totals.setdefault(candidate, 0)
+                totals[candidate] += votes
+        return totals
+
+    def get_winner(self, ballotbox, position_count=1):
+        """
+        Returns the 'position_count' candidates with the most votes as a list
+        of (vote_count, candidate) tuples.
+
+        Only the winners are sorted (using a bounded heap), so filling a few
+        seats from a large field of candidates costs O(candidates *
+        log(position_count)) rather than a sort of the whole field.
+        """
+        return Results(
+            self.get_counts(ballotbox, position_count), position_count)
+
+
+class BlockVoting(MultiMarkBase):
+    """
+    Plurality-at-large voting, also known as block voting or multiple
+    non-transferable vote, is a non-proportional voting system for electing
+    several representatives from a single multimember electoral district. Each
+    voter may mark as many candidates as there are seats to be filled (but no
+    more), and the candidates with the most votes fill the positions.
+
+    Block voting tends to elect a slate of candidates from the largest group
+    of voters: a party supported by a majority of voters can win every seat in
+    the district.
+    """
+    implements(IVotingMethod, IMonotonicityCriterion)
+
+
+class LimitedVoting(MultiMarkBase):
+    """
+    Limited voting is a voting system in which electors have fewer votes than
+    there are positions available. The positions are awarded to the candidates
+    who receive the most votes absolutely.
+
+    Because a majority group cannot mark enough candidates to fill every
+    position, limited voting usually allows a large minority to win some of
+    the seats, making it somewhat more proportional than block voting.
+
+    The 'vote_count' parameter is the number of marks each voter is allowed.
+    """
+    implements(IVotingMethod, IMonotonicityCriterion)
+
+    def __init__(self, vote_count=1):
+        self.vote_count = vote_count
+
+    def get_mark_limit(self, position_count):
+        return self.vote_count
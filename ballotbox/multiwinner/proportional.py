@@ -0,0 +1,462 @@
+"""
+Proportional representation (PR) is a concept in voting systems used to elect
+an assembly or council. PR means that the number of seats won by a party or
+group of candidates is proportionate to the number of votes received. For
+example, under a PR voting system if 30% of voters support a particular party
+then roughly 30% of seats will be won by that party.
+
+Party-list proportional representation systems are a family of voting systems
+emphasizing proportional representation in elections in which multiple
+candidates are elected (e.g., elections to parliament) through allocations to
+an electoral list. In these systems, parties make lists of candidates to be
+elected, and seats are distributed to each party in proportion to the number
+of votes the party receives. Voters may vote directly for the party, or, as in
+an open list system, for candidates, where the vote then pools to the party.
+
+The ballot boxes used by the party-list methods below are plurality-style: each
+vote is simply the name of a party.
+"""
+import heapq
+import time
+from fractions import Fraction, gcd
+
+from zope.interface import implements
+
+from ballotbox.iballot import IVotingMethod
+
+
+class PartyListBase(object):
+    """
+    This is a base class to hold common code for the party-list methods.
+    Subclasses need only implement apportion.
+    """
+    implements(IVotingMethod)
+
+    def apportion(self, votes, position_count):
+        """
+        Allocate 'position_count' seats among the parties in 'votes', a dict
+        mapping each party to its vote count.
+
+        Returns a dict mapping each party to the number of seats it won.
+        """
+        raise NotImplementedError()
+
+    def _get_results(self, votes, seats):
+        results = sorted([
+            (count, votes[party], party) for party, count in seats.items()
+            if count > 0], reverse=True)
+        return [(count, party) for count, ignored, party in results]
+
+    def apportion_districts(self, districts):
+        """
+        Apportion the seats of many districts in a single call.
+
+        The parameter 'districts' should be an iterable of three-tuples:
+            [(district1, votes1, position_count1), ...]
+
+        where each 'votes' is either a ballot box or a dict mapping each party
+        to its vote count. The results are returned in a dict keyed by
+        district, each value being what get_winner would return for it.
+        """
+        results = {}
+        for district, votes, position_count in districts:
+            votes = dict(votes.items())
+            results[district] = self._get_results(
+                votes, self.apportion(votes, position_count))
+        return results
+
+    def get_winner(self, ballotbox, position_count=1):
+        """
+        Returns a list of (seats, party) tuples for every party that won at
+        least one seat, most seats first.
+        """
+        votes = dict(ballotbox.items())
+        return self._get_results(votes, self.apportion(votes, position_count))
+
+
+class HighestAveragesBase(PartyListBase):
+    """
+    The highest averages methods divide the votes received by each party by a
+    series of divisors, producing a table of quotients, or averages, with a row
+    for each divisor and a column for each party. The nth seat is allocated to
+    the party whose column contains the nth largest entry in this table, up to
+    the total number of seats available.
+
+    Rather than building the full table (or rebuilding the quotients after
+    each seat is allocated), only the next quotient for each party is kept in
+    a priority queue. Allocating a seat pops the largest quotient and pushes
+    that party's next one, so an allocation costs O(seats * log(parties)).
+
+    Quotients are kept as exact fractions so that near-ties are not decided by
+    floating point error; real ties go to the party with more votes, and then
+    by name.
+    """
+    def get_divisor(self, seats):
+        """
+        Return the divisor used for a party that has already been allocated
+        'seats' seats.
+        """
+        raise NotImplementedError()
+
+    def apportion(self, votes, position_count):
+        seats = dict.fromkeys(votes, 0)
+        queue = [(-Fraction(count) / self.get_divisor(0), -count, party)
+                 for party, count in votes.items() if count > 0]
+        heapq.heapify(queue)
+        for seat in xrange(position_count):
+            if not queue:
+                break
+            quotient, count, party = queue[0]
+            seats[party] += 1
+            quotient = Fraction(count) / self.get_divisor(seats[party])
+            heapq.heapreplace(queue, (quotient, count, party))
+        return seats
+
+
+class DHondtVoting(HighestAveragesBase):
+    """
+    The D'Hondt method or the Jefferson method is a highest average method for
+    allocating seats, and is thus a type of party-list proportional
+    representation. The method described is named in the United States after
+    Thomas Jefferson, who introduced the method for proportional allocation of
+    seats in the United States House of Representatives in 1791, and in Europe
+    after Belgian mathematician Victor D'Hondt, who described it in 1878 for
+    proportional allocation of parliamentary seats to the parties.
+
+    After all the votes have been tallied, successive quotients are calculated
+    for each party. The formula for the quotient is V/(s+1), where V is the
+    total number of votes that party received, and s is the number of seats
+    that party has been allocated so far, initially 0 for all parties.
+
+    The D'Hondt method slightly favours large parties and coalitions over
+    scattered small parties.
+    """
+    def get_divisor(self, seats):
+        return seats + 1
+
+
+class SainteLagueVoting(HighestAveragesBase):
+    """
+    The Sainte-Lague method of the highest average (equivalent to the Webster
+    method) is a method of allocating seats in a party-list proportional
+    representation electoral system. It is named after French mathematician
+    Andre Sainte-Lague.
+
+    The Sainte-Lague method is closely related to the D'Hondt method, although
+    without the latter's favouritism for larger parties. The quotient for each
+    party is V/(2s+1), where V is the total number of votes that party
+    received, and s is the number of seats that party has been allocated so
+    far.
+
+    See the HighestAveragesVoting factory function's docstring for more
+    information.
+    """
+    def get_divisor(self, seats):
+        return 2 * seats + 1
+
+
+class ModifiedSainteLagueVoting(SainteLagueVoting):
+    """
+    To reduce the favouritism the pure Sainte-Lague method shows towards
+    smaller parties, some countries (e.g. Norway and Sweden) change the first
+    divisor from 1 to 1.4, making it slightly harder for a party to win its
+    first seat; the remaining divisors are unchanged (3, 5, 7, ...).
+
+    See the HighestAveragesVoting factory function's docstring for more
+    information.
+    """
+    def get_divisor(self, seats):
+        if seats == 0:
+            return Fraction(7, 5)
+        return 2 * seats + 1
+
+
+def HighestAveragesVoting(mode="d'hondt"):
+    """
+    The 'mode' parameter can be one of the following:
+        * "d'hondt"
+        * "sainte-lague"
+        * "modified sainte-lague"
+
+    This factory function returns a highest averages voting instance.
+    """
+    if mode == "d'hondt":
+        return DHondtVoting()
+    elif mode == "sainte-lague":
+        return SainteLagueVoting()
+    elif mode == "modified sainte-lague":
+        return ModifiedSainteLagueVoting()
+    else:
+        raise ValueError("Unknown mode '%s'" % mode)
+
+
+class LargestRemainderVoting(PartyListBase):
+    """
+    The largest remainder method (also known as Hare-Niemeyer method or as
+    Vinton's method) is one way of allocating seats proportionally for
+    representative assemblies with party list voting systems.
+
+    The largest remainder method requires the numbers of votes for each party
+    to be divided by a quota representing the number of votes required for a
+    seat (i.e. usually the total number of votes cast divided by the number of
+    seats, or some similar formula). The result for each party will usually
+    consist of an integer part plus a fractional remainder. Each party is first
+    allocated a number of seats equal to their integer. This will generally
+    leave some remaining seats unallocated: the parties are then ranked on the
+    basis of the fractional remainders, and the parties with the largest
+    remainders are each allocated one additional seat until all the seats have
+    been allocated.
+
+    The 'quota' parameter can be one of the following:
+        * "hare" (the total votes divided by the number of seats)
+        * "droop" (one more than the total votes divided by one more than the
+          number of seats, discarding any fractional part)
+    """
+    def __init__(self, quota="hare"):
+        if quota not in ("hare", "droop"):
+            raise ValueError("Unknown quota '%s'" % quota)
+        self.quota = quota
+
+    def _get_quotas(self, votes, position_count):
+        """
+        Return a dict mapping each party to a (whole_seats, remainder) tuple.
+        All of the remainders share a common denominator, so they can be
+        compared as integers.
+        """
+        total = sum(votes.values())
+        quotas = {}
+        if self.quota == "hare":
+            for party, count in votes.items():
+                quotas[party] = divmod(count * position_count, total)
+        else:
+            quota = total // (position_count + 1) + 1
+            for party, count in votes.items():
+                quotas[party] = divmod(count, quota)
+        return quotas
+
+    def apportion(self, votes, position_count):
+        if not position_count or not sum(votes.values()):
+            return dict.fromkeys(votes, 0)
+        quotas = self._get_quotas(votes, position_count)
+        seats = dict([(party, whole) for party, (whole, ignored)
+                      in quotas.items()])
+        remaining = position_count - sum(seats.values())
+        largest = heapq.nlargest(remaining, [
+            (remainder, votes[party], party)
+            for party, (whole, remainder) in quotas.items()])
+        for remainder, count, party in largest:
+            seats[party] += 1
+        return seats
+
+
+class _CommitteeSearch(object):
+    """
+    The state of a single search for the best PAV committee. Ballots are
+    grouped by their set of approved candidates, and for each group we keep
+    the number of committee members it approves of; the marginal gain of a
+    candidate is then a sum over just the groups that approve of them.
+
+    Scores are kept as integer multiples of 1/L, where L is the least common
+    multiple of 1 through the committee size, so all comparisons are exact.
+    """
+    def __init__(self, ballots, position_count, deadline=None):
+        self.position_count = position_count
+        self.deadline = deadline
+        self.expired = False
+        self.denominator = 1
+        for divisor in xrange(2, position_count + 1):
+            self.denominator = (
+                self.denominator * divisor / gcd(self.denominator, divisor))
+        self.weights = [
+            self.denominator / (approved + 1)
+            for approved in xrange(position_count + 1)]
+        self.votes = []
+        self.index = {}
+        for position, (approvals, votes) in enumerate(ballots):
+            self.votes.append(votes)
+            for candidate in approvals:
+                self.index.setdefault(candidate, []).append(position)
+        self.approved = [0] * len(self.votes)
+        self.candidates = sorted(self.index.keys())
+        self.best_score = -1
+        self.best_committee = []
+        self.nodes = 0
+
+    def get_gain(self, candidate):
+        votes, weights, approved = self.votes, self.weights, self.approved
+        return sum([votes[position] * weights[approved[position]]
+                    for position in self.index[candidate]])
+
+    def add(self, candidate):
+        for position in self.index[candidate]:
+            self.approved[position] += 1
+
+    def remove(self, candidate):
+        for position in self.index[candidate]:
+            self.approved[position] -= 1
+
+    def check_deadline(self):
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes % 64:
+            if time.time() > self.deadline:
+                self.expired = True
+        return self.expired
+
+    def greedy(self):
+        """
+        Build a committee one seat at a time, always adding the candidate with
+        the largest marginal gain (this is sequential PAV). The committee is
+        left added to the search state.
+        """
+        committee = []
+        score = 0
+        pool = set(self.candidates)
+        while pool and len(committee) < self.position_count:
+            gain, candidate = max(
+                [(self.get_gain(candidate), candidate) for candidate in pool])
+            pool.remove(candidate)
+            self.add(candidate)
+            committee.append(candidate)
+            score += gain
+        return score, committee
+
+    def local_search(self, score, committee):
+        """
+        Improve a committee by swapping a member for a non-member for as long
+        as that increases the score (or until the deadline passes).
+        """
+        improved = True
+        while improved and not self.expired:
+            improved = False
+            outside = [candidate for candidate in self.candidates
+                       if candidate not in committee]
+            for member in list(committee):
+                self.remove(member)
+                loss = self.get_gain(member)
+                gain, candidate = max(
+                    [(self.get_gain(candidate), candidate)
+                     for candidate in outside] or [(0, None)])
+                if gain > loss:
+                    committee[committee.index(member)] = candidate
+                    self.add(candidate)
+                    score += gain - loss
+                    improved = True
+                    break
+                self.add(member)
+                if self.check_deadline():
+                    break
+        return score, committee
+
+    def branch_and_bound(self, committee, pool, score):
+        """
+        Search every committee that extends 'committee' with candidates from
+        'pool'.
+
+        PAV scores are submodular: adding members to a committee never
+        increases the marginal gain of another candidate. So the current
+        score, plus the largest marginal gains in the pool for each of the
+        seats still open, is an upper bound for every committee below this
+        node. The pool is sorted by marginal gain, which makes the first
+        branch the greedy choice and lets us stop at the first branch whose
+        bound cannot beat the best committee found so far.
+        """
+        if self.check_deadline():
+            return
+        needed = self.position_count - len(committee)
+        if not needed:
+            if score > self.best_score:
+                self.best_score = score
+                self.best_committee = list(committee)
+            return
+        gains = sorted([(self.get_gain(candidate), candidate)
+                        for candidate in pool], reverse=True)
+        for position in xrange(len(gains) - needed + 1):
+            bound = score + sum([
+                gains[later][0] for later in
+                xrange(position, position + needed)])
+            if bound <= self.best_score or self.expired:
+                break
+            gain, candidate = gains[position]
+            self.add(candidate)
+            committee.append(candidate)
+            pool = [
+                gains[later][1] for later in xrange(position + 1, len(gains))]
+            self.branch_and_bound(committee, pool, score + gain)
+            committee.pop()
+            self.remove(candidate)
+
+    def solve(self, exact=True):
+        score, committee = self.greedy()
+        score, committee = self.local_search(score, committee)
+        for candidate in committee:
+            self.remove(candidate)
+        self.best_score, self.best_committee = score, committee
+        if exact and not self.expired:
+            self.branch_and_bound([], self.candidates, 0)
+        return self.best_score, self.best_committee
+
+
+class ProportionalApprovalVoting(object):
+    """
+    Proportional approval voting (PAV) is a proportional electoral system for
+    multiwinner elections. It is a multiwinner extension of approval voting,
+    first proposed by the Danish statistician Thorvald N. Thiele in the early
+    1900s.
+
+    Each voter approves of any number of candidates, and the committee which
+    maximizes the total satisfaction of the voters wins. A voter who approves
+    of m members of a committee contributes 1 + 1/2 + ... + 1/m to that
+    committee's score; each additional approved member is worth less than the
+    one before, which is what makes the method proportional.
+
+    Each ballot is a list of the candidates the voter approves of.
+
+    Finding the best committee is NP-hard, so it is found with a
+    branch-and-bound search over the ballots grouped by their set of approved
+    candidates. The search starts from the sequential (greedy) PAV committee,
+    improved by local search, which is also what is returned if the search
+    runs for longer than the 'time_budget' parameter (in seconds). A
+    'time_budget' of 0 skips the exact search altogether.
+    """
+    implements(IVotingMethod)
+
+    def __init__(self, time_budget=None):
+        self.time_budget = time_budget
+
+    def group_ballots(self, ballotbox):
+        """
+        Return a list of (approvals, vote_count) tuples, one for each unique
+        set of approved candidates.
+        """
+        groups = {}
+        for approvals, votes in ballotbox.items():
+            approvals = frozenset(approvals)
+            if approvals:
+                groups[approvals] = groups.get(approvals, 0) + votes
+        return groups.items()
+
+    def get_committee(self, ballotbox, position_count=1):
+        """
+        Returns a (score, committee, optimal) tuple, where 'optimal' is False
+        if the time budget ran out before the search was finished.
+        """
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.time() + self.time_budget
+        search = _CommitteeSearch(
+            self.group_ballots(ballotbox), position_count, deadline)
+        score, committee = search.solve(exact=self.time_budget != 0)
+        score = Fraction(score, search.denominator)
+        if score.denominator == 1:
+            score = score.numerator
+        optimal = self.time_budget != 0 and not search.expired
+        return score, tuple(sorted(committee)), optimal
+
+    def get_winner(self, ballotbox, position_count=1):
+        """
+        Returns the winning committee as a list with a single (score,
+        committee) tuple, where the committee is a tuple of candidates.
+        """
+        score, committee, optimal = self.get_committee(
+            ballotbox, position_count)
+        return [(score, committee)]
@@ -0,0 +1,158 @@
+"""
+Semi-proportional representation characterizes multi-winner electoral systems
+which allow representation of minorities, but are not intended to reflect the
+strength of the competing political forces in close proportion to the votes
+they receive. Semi-proportional voting systems are generally used as a
+compromise between complex and expensive but more-fair proportional systems
+(like single transferable vote) and simple winner-take-all systems (like
+first-past-the-post).
+"""
+from fractions import Fraction, gcd
+
+from zope.interface import implements
+
+from ballotbox.criteria import IMonotonicityCriterion
+from ballotbox.iballot import IVotingMethod
+from ballotbox.multiwinner.majoritarian import LimitedVoting
+from ballotbox.results import Results
+
+
+class SingleNonTransferableVoting(LimitedVoting):
+    """
+    Single non-transferable vote or SNTV is an electoral system used in
+    multi-member constituency elections. In any election, each voter casts
+    one vote for one candidate in a multi-candidate race for multiple offices.
+    Posts are filled by the candidates with the most votes. Thus, in a
+    three-seat constituency, the three candidates receiving the largest
+    numbers of votes would win office.
+
+    SNTV is the limiting case of limited voting, where each voter has a single
+    vote. A ballot may be given either as a candidate name or as a list
+    holding one candidate; ballots marking more than one candidate are spoiled.
+    """
+    implements(IVotingMethod, IMonotonicityCriterion)
+
+    def __init__(self):
+        super(SingleNonTransferableVoting, self).__init__(vote_count=1)
+
+
+class CumulativeVoting(object):
+    """
+    Cumulative voting (also accumulation voting, weighted voting or
+    multi-voting) is a multiple-winner voting system intended to promote more
+    proportional representation than winner-take-all elections. Cumulative
+    voting is used frequently in corporate governance, where it is mandated by
+    some U.S. states.
+
+    In elections by cumulative voting, the voter is given a number of points
+    (usually the number of seats to be filled) and may distribute them among
+    the candidates as they wish, including giving all of their points to a
+    single candidate. The candidates with the most points fill the seats.
+
+    Each ballot is a dict mapping candidates to the points given to them. The
+    'vote_count' parameter is the number of points each voter may spend;
+    ballots spending more than that are spoiled and not counted.
+    """
+    implements(IVotingMethod, IMonotonicityCriterion)
+
+    def __init__(self, vote_count=1):
+        self.vote_count = vote_count
+
+    def get_counts(self, ballotbox):
+        totals = {}
+        for points, votes in ballotbox.items():
+            if sum(points.values()) > self.vote_count:
+                continue
+            for candidate, point in points.items():
+                totals.setdefault(candidate, 0)
+                totals[candidate] += point * votes
+        return totals
+
+    def get_winner(self, ballotbox, position_count=1):
+        return Results(self.get_counts(ballotbox), position_count)
+
+
+class SequentialProportionalApprovalVoting(object):
+    """
+    Sequential Proportional Approval Voting (SPAV), also known as reweighted
+    approval voting, is a multi-winner extension of approval voting developed
+    by the Danish statistician Thorvald N. Thiele in the early 1900s. It was
+    used (in a party-list form) in Sweden for a short period after 1909.
+
+    Each voter approves of any number of candidates. Seats are filled one at a
+    time: the candidate with the most (weighted) approvals wins the seat, and
+    every ballot approving of an elected candidate is then reweighted. A
+    ballot that approves of m of the candidates elected so far has a weight of
+    1/(m+1).
+
+    Each ballot is a list of the candidates the voter approves of.
+
+    The ballots are indexed by candidate, so that electing a candidate only
+    rescores the ballots which approve of that candidate instead of rescanning
+    the whole ballot box. Weights are kept as integer multiples of 1/L, where
+    L is the least common multiple of every weight denominator that can occur,
+    so all the arithmetic is exact.
+    """
+    implements(IVotingMethod)
+
+    def _get_common_denominator(self, position_count):
+        denominator = 1
+        for divisor in xrange(2, position_count + 2):
+            denominator = denominator * divisor / gcd(denominator, divisor)
+        return denominator
+
+    def build_index(self, ballotbox):
+        """
+        Return a (ballots, index) tuple, where 'ballots' is a list of
+        (candidates, vote_count) tuples, one for each unique ballot, and
+        'index' maps each candidate to the positions in 'ballots' of the
+        ballots that approve of them.
+        """
+        ballots = []
+        index = {}
+        for approvals, votes in ballotbox.items():
+            approvals = set(approvals)
+            position = len(ballots)
+            ballots.append((approvals, votes))
+            for candidate in approvals:
+                index.setdefault(candidate, []).append(position)
+        return ballots, index
+
+    def get_winner(self, ballotbox, position_count=1):
+        """
+        Returns the elected candidates, in the order in which they were
+        elected, as a list of (score, candidate) tuples; the score is the
+        weighted approval the candidate had when they were elected.
+        """
+        ballots, index = self.build_index(ballotbox)
+        denominator = self._get_common_denominator(position_count)
+        # the number of elected candidates each ballot approves of
+        elected_counts = [0] * len(ballots)
+        scores = {}
+        for candidate, positions in index.items():
+            scores[candidate] = denominator * sum(
+                [ballots[position][1] for position in positions])
+        winners = []
+        while scores and len(winners) < position_count:
+            score, winner = max(
+                [(score, candidate) for candidate, score in scores.items()])
+            del scores[winner]
+            winners.append((_get_number(score, denominator), winner))
+            # only the ballots approving of the winner change weight
+            for position in index[winner]:
+                approvals, votes = ballots[position]
+                elected = elected_counts[position]
+                old_weight = denominator / (elected + 1)
+                new_weight = denominator / (elected + 2)
+                elected_counts[position] = elected + 1
+                delta = (new_weight - old_weight) * votes
+                for candidate in approvals:
+                    if candidate in scores:
+                        scores[candidate] += delta
+        return winners
+
+
+def _get_number(numerator, denominator):
+    if numerator % denominator:
+        return Fraction(numerator, denominator)
+    return numerator / denominator
@@ -0,0 +1,158 @@
+"""
+Timing where a count spends its time.
+
+A Profiler, while it is enabled, wraps the parts of the library that a count
+spends its time in (decoding ballots, building the histogram, the tally and
+the pairwise lookup, sorting results, elimination rounds and so on) and
+records how often each phase ran and the wall time it took. Each call of
+BallotBox.get_winner is also recorded with the method and the size of the
+count: the number of unique ballots, votes and candidates. Nothing is
+wrapped while no profiler is enabled, so counting costs exactly what it did.
+
+The records are given as a report (a dict of plain values), and can also be
+sent as they are made to sinks: callables taking the name of the phase, the
+seconds it took, and a dict of anything else recorded, for passing on to a
+metrics service.
+
+With 'count_objects' set, the change in the number of objects the garbage
+collector tracks is recorded for each phase too; it is slow, since every
+object is counted before and after each phase.
+"""
+import gc
+import time
+
+from ballotbox.ballot import BallotBox
+from ballotbox.results import Results
+from ballotbox.singlewinner.preferential.base import PairWiseBase
+from ballotbox.singlewinner.preferential.condorcet import (
+    KemenyYoungVoting, NansonVoting)
+from ballotbox.tally import Tally
+
+
+# the (class, attribute, phase) of everything a profiler times
+PHASES = [
+    (BallotBox, "get_winner", "get_winner"),
+    (BallotBox, "_decode", "decode"),
+    (BallotBox, "get_histogram", "histogram"),
+    (Tally, "__init__", "tally"),
+    (Tally, "pairwise", "pairwise"),
+    (PairWiseBase, "build_lookup", "build_lookup"),
+    (Results, "ranking", "ranking"),
+    (KemenyYoungVoting, "get_ranks", "rankings"),
+    (NansonVoting, "count_rounds", "elimination"),
+    (NansonVoting, "get_round_totals", "elimination_round"),
+    ]
+
+
+class PhaseStats(object):
+    """
+    The number of times a phase ran, and the seconds (and, if counted, the
+    objects) it took in all.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.objects = 0
+
+    def as_dict(self):
+        return {"calls": self.calls, "seconds": self.seconds,
+                "objects": self.objects}
+
+
+class Profiler(object):
+    """
+    Records the phases of counts while enabled, either between enable() and
+    disable() or in a with statement.
+    """
+    active = None
+
+    def __init__(self, sinks=(), count_objects=False):
+        self.sinks = list(sinks)
+        self.count_objects = count_objects
+        self.phases = {}
+        self.counts = []
+        self._originals = []
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def _record(self, phase, seconds, objects, info):
+        stats = self.phases.setdefault(phase, PhaseStats())
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.objects += objects
+        for sink in self.sinks:
+            sink(phase, seconds, info)
+
+    def _time(self, phase, function, args, kwargs):
+        objects = 0
+        if self.count_objects:
+            objects = -len(gc.get_objects())
+        start = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            seconds = time.time() - start
+            if self.count_objects:
+                objects += len(gc.get_objects())
+            info = {}
+            if phase == "get_winner":
+                info = self._get_count_info(args[0], seconds)
+                self.counts.append(info)
+            if objects:
+                info = dict(info, objects=objects)
+            self._record(phase, seconds, objects, info)
+
+    def _get_count_info(self, ballotbox, seconds):
+        return {"method": ballotbox.method.__class__.__name__,
+                "ballots": len(ballotbox),
+                "votes": ballotbox.get_total_votes(),
+                "candidates": len(ballotbox.get_candidate_index()),
+                "seconds": seconds}
+
+    def _wrap(self, phase, function):
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            return profiler._time(phase, function, args, kwargs)
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+
+    def enable(self):
+        if Profiler.active is not None:
+            raise RuntimeError("a profiler is already enabled")
+        Profiler.active = self
+        for klass, name, phase in PHASES:
+            original = klass.__dict__[name]
+            if isinstance(original, property):
+                wrapped = property(self._wrap(phase, original.fget))
+            else:
+                wrapped = self._wrap(phase, original)
+            self._originals.append((klass, name, original))
+            setattr(klass, name, wrapped)
+
+    def disable(self):
+        for klass, name, original in reversed(self._originals):
+            setattr(klass, name, original)
+        self._originals = []
+        Profiler.active = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def report(self):
+        """
+        Return the records as a dict: 'phases' maps each phase to the number
+        of calls and the seconds (and objects) they took, and 'counts' lists
+        a dict for each count, giving the method, the number of unique
+        ballots, votes and candidates, and the seconds it took.
+        """
+        return {
+            "phases": dict([(phase, stats.as_dict())
+                            for phase, stats in self.phases.items()]),
+            "counts": list(self.counts)}
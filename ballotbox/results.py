@@ -0,0 +1,121 @@
+import heapq
+import itertools
+
+from zope.interface import implements
+
+from ballotbox.iballot import IResults
+
+
+class Results(list):
+    """
+    The results of a count.
+
+    This is a list of the (score, candidate) tuples for the winning positions,
+    exactly as get_winner has always returned, but it also carries the score of
+    every candidate from the method's tally so that rankings, ties and margins
+    can be had without counting (or sorting) again. The full ranking is only
+    sorted the first time it is asked for.
+
+    A method that filled no positions returns an empty list (with a
+    'position_count' of 0), whose winners are an empty list too, even though
+    the scores are still there to rank.
+    """
+    implements(IResults)
+
+    def __init__(self, scores, position_count=1, order=None):
+        self.scores = dict(scores)
+        self.position_count = position_count
+        # methods which do not rank candidates by their scores alone (such as
+        # the elimination methods) give a sort key for each candidate
+        self.order = order
+        self._ranking = None
+        super(Results, self).__init__(self.top(position_count))
+
+    def _get_keys(self):
+        if self.order is None:
+            return [(score, score, candidate)
+                    for candidate, score in self.scores.items()]
+        return [(self.order[candidate], score, candidate)
+                for candidate, score in self.scores.items()]
+
+    def copy(self):
+        """
+        Return a copy of the results, which can be changed without changing
+        these.
+        """
+        results = self.__class__.__new__(self.__class__)
+        list.__init__(results, self)
+        results.scores = dict(self.scores)
+        results.position_count = self.position_count
+        results.order = self.order
+        if self.order is not None:
+            results.order = dict(self.order)
+        results._ranking = self._ranking
+        if self._ranking is not None:
+            results._ranking = list(self._ranking)
+        return results
+
+    def top(self, count):
+        """
+        Return the (score, candidate) tuples of the first 'count' positions.
+        """
+        if self._ranking is not None:
+            return self._ranking[0:count]
+        return [(score, candidate) for key, score, candidate
+                in heapq.nlargest(count, self._get_keys())]
+
+    @property
+    def ranking(self):
+        if self._ranking is None:
+            self._ranking = [
+                (score, candidate) for key, score, candidate
+                in sorted(self._get_keys(), reverse=True)]
+        return self._ranking
+
+    @property
+    def tie_groups(self):
+        groups = []
+        for key, group in itertools.groupby(
+                sorted(self._get_keys(), reverse=True),
+                lambda result: result[0]):
+            groups.append([candidate for key, score, candidate in group])
+        return groups
+
+    @property
+    def winners(self):
+        """
+        The candidates tied for first place; there are none if the method
+        filled no positions (e.g., when no candidate has a majority).
+        """
+        if not self.scores or not self.position_count:
+            return []
+        return self.tie_groups[0]
+
+    @property
+    def winner(self):
+        winners = self.winners
+        if len(winners) == 1:
+            return winners[0]
+
+    @property
+    def is_tied(self):
+        return len(self.winners) > 1
+
+    @property
+    def margins(self):
+        ranking = self.ranking
+        return [(score - next_score, candidate)
+                for (score, candidate), (next_score, next_candidate)
+                in zip(ranking, ranking[1:])]
+
+    @property
+    def margin(self):
+        if len(self.scores) < 2:
+            return None
+        return self.margins[0][0]
+
+    def get_margin(self, candidate1, candidate2):
+        """
+        Return how far candidate1's score is ahead of candidate2's.
+        """
+        return self.scores[candidate1] - self.scores[candidate2]
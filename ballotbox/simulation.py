@@ -0,0 +1,199 @@
+"""
+Comparing voting methods on simulated elections.
+
+A simulation generates many random elections from a model (see
+ballotbox.generators), counts each of them with every method, and keeps
+running statistics of how often each method elects the Condorcet winner, how
+often it ends in a tie, and how often each pair of methods agree. Trials are
+run in chunks across a process pool, each chunk with its own random stream
+seeded from the simulation's seed, and the statistics of each chunk are
+merged as they come back, so memory use does not grow with the number of
+trials.
+"""
+from __future__ import absolute_import
+
+import itertools
+import math
+import random
+
+from ballotbox.compliance import get_condorcet_winner
+from ballotbox.tally import Tally, get_winning_candidate
+
+
+class RunningStats(object):
+    """
+    The count, mean and variance of a stream of values, updated one value at
+    a time with Welford's method, and merged with the statistics of another
+    stream with Chan's formula.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sum_of_squares = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.sum_of_squares += delta * (value - self.mean)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.sum_of_squares += other.sum_of_squares + (
+            delta * delta * self.count * other.count / count)
+        self.count = count
+
+    @property
+    def variance(self):
+        """
+        The sample variance, or None for fewer than two values.
+        """
+        if self.count < 2:
+            return None
+        return self.sum_of_squares / (self.count - 1)
+
+    @property
+    def standard_error(self):
+        """
+        The standard error of the mean, or None for fewer than two values.
+        """
+        if self.count < 2:
+            return None
+        return math.sqrt(self.variance / self.count)
+
+    def __repr__(self):
+        return "<RunningStats count=%s mean=%r variance=%r>" % (
+            self.count, self.mean, self.variance)
+
+
+class SimulationResults(object):
+    """
+    The statistics of a simulation, for methods given by their index in the
+    list of methods simulated:
+
+        * condorcet_winners: how often an election had a Condorcet winner
+
+        * condorcet_efficiency: for each method, how often it elected the
+          Condorcet winner, over the elections that had one
+
+        * ties: for each method, how often it had no single winner
+
+        * agreement: a dict mapping each (index1, index2) pair of methods to
+          how often they elected the same single winner
+    """
+    def __init__(self, method_count):
+        self.method_count = method_count
+        self.trial_count = 0
+        self.condorcet_winners = RunningStats()
+        self.condorcet_efficiency = [
+            RunningStats() for index in xrange(method_count)]
+        self.ties = [RunningStats() for index in xrange(method_count)]
+        self.agreement = dict([
+            (pair, RunningStats())
+            for pair in itertools.combinations(xrange(method_count), 2)])
+
+    def add_trial(self, winners, condorcet_winner):
+        """
+        Add the winners of each method (None for a tie) for one election.
+        """
+        self.trial_count += 1
+        self.condorcet_winners.add(int(condorcet_winner is not None))
+        for index, winner in enumerate(winners):
+            self.ties[index].add(int(winner is None))
+            if condorcet_winner is not None:
+                self.condorcet_efficiency[index].add(
+                    int(winner == condorcet_winner))
+        for (index1, index2), stats in self.agreement.items():
+            winner = winners[index1]
+            stats.add(int(winner is not None and winner == winners[index2]))
+
+    def merge(self, other):
+        self.trial_count += other.trial_count
+        self.condorcet_winners.merge(other.condorcet_winners)
+        for index in xrange(self.method_count):
+            self.condorcet_efficiency[index].merge(
+                other.condorcet_efficiency[index])
+            self.ties[index].merge(other.ties[index])
+        for pair, stats in self.agreement.items():
+            stats.merge(other.agreement[pair])
+
+
+def run_trials(model, methods, candidates, voter_count, trial_count, seed):
+    """
+    Run 'trial_count' elections with a random stream seeded with 'seed',
+    returning their SimulationResults.
+    """
+    generator = random.Random(seed)
+    results = SimulationResults(len(methods))
+    for trial in xrange(trial_count):
+        tally = Tally(
+            ballots=model(candidates, voter_count, generator))
+        winners = [get_winning_candidate(result)
+                   for result in tally.evaluate(methods)]
+        results.add_trial(winners, get_condorcet_winner(tally))
+    return results
+
+
+def get_chunks(trial_count, chunk_size, seed):
+    """
+    Split the trials into chunks, each given its own seed from a stream
+    seeded with 'seed'.
+    """
+    seeds = random.Random(seed)
+    for start in xrange(0, trial_count, chunk_size):
+        yield seeds.getrandbits(64), min(chunk_size, trial_count - start)
+
+
+# the simulation being run by a worker process, set when the worker starts
+# so that it is not sent along with every chunk
+_simulation = None
+
+
+def _set_simulation(*args):
+    global _simulation
+    _simulation = args
+
+
+def _run_chunk(chunk):
+    model, methods, candidates, voter_count = _simulation
+    chunk_seed, trial_count = chunk
+    return run_trials(
+        model, methods, candidates, voter_count, trial_count, chunk_seed)
+
+
+def simulate(model, methods, candidates, voter_count, trial_count,
+             seed=None, processes=None, chunk_size=100):
+    """
+    Simulate 'trial_count' elections of 'voter_count' voters between the
+    given candidates, with profiles drawn from 'model', and return their
+    SimulationResults.
+
+    Each item of 'methods' is either an IVotingMethod provider or a (method,
+    kwargs) tuple, as for BallotBox.evaluate. The trials are run in chunks of
+    'chunk_size' in 'processes' worker processes (by default, one for each
+    CPU); with 'processes' set to 1, they are run in this process. The same
+    seed gives the same results, however many processes are used.
+    """
+    methods = list(methods)
+    results = SimulationResults(len(methods))
+    chunks = get_chunks(trial_count, chunk_size, seed)
+    if processes == 1:
+        for chunk_seed, count in chunks:
+            results.merge(run_trials(
+                model, methods, candidates, voter_count, count, chunk_seed))
+        return results
+    # imported only when there are workers to start
+    import multiprocessing
+    pool = multiprocessing.Pool(
+        processes, _set_simulation, (model, methods, candidates, voter_count))
+    try:
+        for chunk_results in pool.imap(_run_chunk, chunks):
+            results.merge(chunk_results)
+    finally:
+        pool.close()
+        pool.join()
+    return results
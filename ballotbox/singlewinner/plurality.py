@@ -30,7 +30,9 @@ in a particular constituency using bloc voting.
 """
 from zope.interface import implements
 
-from ballotbox.iballot import IVotingMethod
+from ballotbox import margins
+from ballotbox.iballot import IMarginVotingMethod, IVotingMethod
+from ballotbox.results import Results
 
 
 class FirstPastPostVoting(object):
@@ -57,14 +59,27 @@ class FirstPastPostVoting(object):
     vote for as many candidates as there are vacant positions; the candidate(s)
     with the highest number of votes is elected.
     """
-    implements(IVotingMethod)
+    implements(IMarginVotingMethod)
 
     def get_winner(self, ballotbox, position_count=1):
         """
+        Only the winners are sorted, using a bounded heap, so picking a few
+        positions from a large field of candidates does not sort the whole
+        field.
+        """
+        return Results(ballotbox.items(), position_count)
+
+    def get_tally_winner(self, tally, position_count=1):
         """
-        results = sorted([(count, name) for name, count in ballotbox.items()],
-                         reverse=True)
-        return results[0:position_count]
+        Count the first preferences of a tally, so that plurality can be
+        counted from ranked ballots too.
+        """
+        return Results(tally.first_preferences, position_count)
+
+    def get_tally_margin(self, tally):
+        counts = dict.fromkeys(tally.candidates, 0)
+        counts.update(tally.first_preferences)
+        return margins.get_plurality_margin(counts)
 
 
 class TwoRoundVoting(object):
@@ -1,7 +1,19 @@
-from ballotbox.singlewinner.preferential.borda import BordaVoting
-from ballotbox.singlewinner.preferential.condorcet import (
-    CopelandVoting, KemenyYoungVoting, NansonVoting, BaldwinVoting,
-    RankedPairsVoting, DodgsonVoting)
-from ballotbox.singlewinner.preferential.minimax import MinimaxVoting
-from ballotbox.singlewinner.preferential.other import (
-    BucklinVoting, OklahomaVoting, CoombsVoting, InstantRunoffVoting)
+from ballotbox.util.lazy import make_lazy
+
+
+# the methods are only imported when they are first looked up, so that
+# importing the package (or one of its modules) doesn't import them all
+make_lazy(__name__, {
+    "BordaVoting": "ballotbox.singlewinner.preferential.borda",
+    "CopelandVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "KemenyYoungVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "NansonVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "BaldwinVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "RankedPairsVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "DodgsonVoting": "ballotbox.singlewinner.preferential.condorcet",
+    "MinimaxVoting": "ballotbox.singlewinner.preferential.minimax",
+    "BucklinVoting": "ballotbox.singlewinner.preferential.other",
+    "OklahomaVoting": "ballotbox.singlewinner.preferential.other",
+    "CoombsVoting": "ballotbox.singlewinner.preferential.other",
+    "InstantRunoffVoting": "ballotbox.singlewinner.preferential.other",
+    })
@@ -1,3 +1,20 @@
+import functools
+
+from zope.interface import implements
+
+from ballotbox import margins
+from ballotbox.iballot import IMarginVotingMethod
+from ballotbox.results import Results
+
+
+def add_unranked_candidates(totals, candidates):
+    """
+    Give the candidates which no ballot ranks (as in a tally with an unranked
+    tier) no points, so that they are still ranked.
+    """
+    for candidate in candidates:
+        totals.setdefault(candidate, 0)
+    return totals
 
 
 class StandardBordaVoting(object):
@@ -36,33 +53,93 @@ class StandardBordaVoting(object):
     candidates a candidate will receive n points for a first preference, n-1
     points for a second preference, n-2 for a third, and so on.
     """
-    def __init__(self):
-        self.candidate_count = 0
+    implements(IMarginVotingMethod)
 
     def get_candidates(self, ballotbox):
-        preferences = ballotbox.keys()[0]
-        return preferences.keys()
+        return ballotbox.get_candidates()
 
     def get_candidate_count(self, ballotbox):
-        return len(self.get_candidates(ballotbox))
+        # every candidate of the election: those on any ballot for a ballot
+        # box, and those declared (even if no ballot ranks them) for a tally
+        return len(ballotbox.get_candidates())
 
-    def get_points(self, rank):
-        return self.candidate_count - rank
+    def get_points(self, rank, candidate_count):
+        return candidate_count - rank
+
+    def get_totals(self, ballotbox):
+        return add_unranked_candidates(
+            self.get_histogram_totals(
+                ballotbox.get_histogram(),
+                self.get_candidate_count(ballotbox)),
+            ballotbox.get_candidates())
 
     def get_counts(self, ballotbox):
-        totals = {}
-        for preferences, votes in ballotbox.items():
-            for candidate, rank in preferences.items():
-                totals.setdefault(candidate, 0)
-                totals[candidate] += self.get_points(rank) * votes
-        return sorted(
-            [(count, candidate) for candidate, count in totals.items()],
-            reverse=True)
+        return Results(self.get_totals(ballotbox)).ranking
 
     def get_winner(self, ballotbox):
-        self.candidate_count = self.get_candidate_count(ballotbox)
-        results = self.get_counts(ballotbox)
-        return [results[0]]
+        return Results(self.get_totals(ballotbox))
+
+    def get_histogram_totals(self, histogram, candidate_count):
+        """
+        Score each candidate from a histogram of the number of votes giving
+        them each rank. This is O(candidates ** 2), however many ballots
+        there are.
+        """
+        totals = {}
+        for candidate, counts in histogram.items():
+            totals[candidate] = sum([
+                self.get_points(rank, candidate_count) * votes
+                for rank, votes in counts.items()])
+        return totals
+
+    def get_tally_winner(self, tally):
+        return Results(self.get_totals(tally))
+
+    def get_ballot_points(self, preferences, candidate_count):
+        """
+        Return a dict mapping each candidate ranked on a ballot to the points
+        the ballot gives them.
+        """
+        return dict([(candidate, self.get_points(rank, candidate_count))
+                     for candidate, rank in preferences.items()])
+
+    def get_tally_margin(self, tally):
+        """
+        For each challenger, the ballots are changed in the order that closes
+        the winner's lead fastest (see margins.get_points_margin); the margin
+        is the fewest changes over all the challengers.
+        """
+        results = self.get_tally_winner(tally)
+        winner = results.winner
+        if winner is None:
+            if len(results.scores) < 2:
+                return None
+            return 0, 0
+        margin = None
+        get_ballot_points = functools.partial(
+            self.get_ballot_points,
+            candidate_count=self.get_candidate_count(tally))
+        for challenger in tally.candidates:
+            if challenger == winner:
+                continue
+            # the ballot that does the most for the challenger over the
+            # winner ranks the challenger first and the winner last
+            others = [candidate for candidate in tally.candidates
+                      if candidate not in (winner, challenger)]
+            ballot = dict([(candidate, rank + 2)
+                           for rank, candidate in enumerate(others)])
+            ballot[challenger] = 1
+            ballot[winner] = len(tally.candidates)
+            points = get_ballot_points(ballot)
+            changed = margins.get_points_margin(
+                tally.ballots, winner, challenger,
+                results.get_margin(winner, challenger),
+                points[challenger] - points[winner], get_ballot_points)
+            if changed is not None and (margin is None or changed < margin):
+                margin = changed
+        if margin is None:
+            return None
+        return margin, margin
 
 
 class FractionalBordaVoting(StandardBordaVoting):
@@ -78,9 +155,32 @@ class FractionalBordaVoting(StandardBordaVoting):
 
     See the StandardBordaVoting factory function's docstring for more
     information.
+
+    The points are counted exactly, so that candidates with equal scores tie
+    rather than differing in the last bit of a float: every rank's points are
+    counted as a whole number of parts of a denominator shared by all the
+    ranks (their least common multiple), and only the totals are made into
+    fractions.
     """
-    def get_points(self, rank):
-        return 1/float(rank)
+    def get_points(self, rank, candidate_count):
+        # fractions (and the decimal module it imports) is only imported by
+        # the methods which use it
+        from fractions import Fraction
+        return Fraction(1, rank)
+
+    def get_histogram_totals(self, histogram, candidate_count):
+        from fractions import Fraction, gcd
+        ranks = set()
+        for counts in histogram.values():
+            ranks.update(counts.keys())
+        denominator = reduce(
+            lambda lcm, rank: lcm * rank // gcd(lcm, rank), ranks, 1)
+        totals = {}
+        for candidate, counts in histogram.items():
+            totals[candidate] = Fraction(sum([
+                denominator // rank * votes
+                for rank, votes in counts.items()]), denominator)
+        return totals
 
 
 class TruncatedBordaVoting(StandardBordaVoting):
@@ -102,9 +202,9 @@ class TruncatedBordaVoting(StandardBordaVoting):
     See the StandardBordaVoting factory function's docstring for more
     information.
     """
-    def get_points(self, rank):
+    def get_points(self, rank, candidate_count):
         if rank > 0:
-            points = self.candidate_count - rank
+            points = candidate_count - rank
         else:
             points = 0
         return points
@@ -163,15 +263,27 @@ class ModifedBordaVoting(StandardBordaVoting):
         count = len(candidates)
         return count - rank
 
-    def get_counts(self, ballotbox):
+    def get_ballot_points(self, preferences, candidate_count=None):
+        # the points come from the ballot's length, not the number of
+        # candidates; the length is the same for each of its candidates, so
+        # it is only found once, keeping this O(ranked) per ballot
+        count = len(preferences)
+        return dict([(candidate, count - rank)
+                     for candidate, rank in preferences.items()])
+
+    def get_totals(self, ballotbox):
+        # the points depend on how many candidates each ballot ranks, which
+        # the histogram doesn't keep, so the ballots are counted instead
         totals = {}
         for preferences, votes in ballotbox.items():
-            for candidate, rank in preferences.items():
+            for candidate, points in self.get_ballot_points(
+                    preferences).items():
                 totals.setdefault(candidate, 0)
-                totals[candidate] += self.get_points(preferences, rank) * votes
-        return sorted(
-            [(count, candidate) for candidate, count in totals.items()],
-            reverse=True)
+                totals[candidate] += points * votes
+        return add_unranked_candidates(totals, ballotbox.get_candidates())
+
+    def get_tally_winner(self, tally):
+        return Results(self.get_totals(tally))
 
 
 def BordaVoting(mode="standard", *args, **kwargs):
@@ -6,7 +6,10 @@ from ballotbox.criteria import (
     ICondorcetCriterion, ICondorcetLoserCriterion,
     IIndependenceOfClonesCriterion, IMajorityCriterion, IMonotonicityCriterion,
     ISmithCriterion)
-from ballotbox.iballot import IVotingMethod
+from ballotbox import margins
+from ballotbox.iballot import (
+    IMarginVotingMethod, ITallyVotingMethod, IVotingMethod)
+from ballotbox.results import Results
 from ballotbox.singlewinner.preferential import base, borda
 
 
@@ -24,7 +27,7 @@ class CopelandVoting(object):
     Copeland requires a Smith set containing at least five candidates to give a
     clear winner unless two or more candidates tie in pairwise comparisons.
     """
-    implements(IVotingMethod, ICondorcetCriterion)
+    implements(ITallyVotingMethod, ICondorcetCriterion)
 
     def get_winner(self, ignored, ballotboxes):
         data = {}
@@ -36,10 +39,30 @@ class CopelandVoting(object):
             loser = (candidates - set(winner)).pop()
             data[winner]["wins"] += 1
             data[loser]["losses"] += 1
-        results = sorted([
-            (stats['wins'] - stats['losses'], candidate)
-            for candidate, stats in data.items()], reverse=True)
-        return [results[0]]
+        return Results([
+            (candidate, stats['wins'] - stats['losses'])
+            for candidate, stats in data.items()])
+
+    def get_tally_winner(self, tally):
+        """
+        Count the pairwise victories and defeats from the pairwise counts of
+        a tally, rather than from a ballot box for each pair.
+        """
+        pairwise = tally.pairwise
+        scores = dict.fromkeys(tally.candidates, 0)
+        for index, candidate1 in enumerate(tally.candidates):
+            for candidate2 in tally.candidates[index + 1:]:
+                votes_for = pairwise.get(
+                    "%s > %s" % (candidate1, candidate2), 0)
+                votes_against = pairwise.get(
+                    "%s > %s" % (candidate2, candidate1), 0)
+                if votes_for > votes_against:
+                    scores[candidate1] += 1
+                    scores[candidate2] -= 1
+                elif votes_against > votes_for:
+                    scores[candidate1] -= 1
+                    scores[candidate2] += 1
+        return Results(scores)
 
 
 class KemenyYoungVoting(base.PairWiseBase):
@@ -80,25 +103,38 @@ class KemenyYoungVoting(base.PairWiseBase):
     possible rankings are tied, and typically the overall ranking involves one
     or more ties.)
     """
-    implements(IVotingMethod, ICondorcetCriterion)
+    implements(IMarginVotingMethod, ICondorcetCriterion)
 
-    def get_ranks(self):
+    def get_ranks(self, preference_options, lookup):
+        """
+        Score every ordering of the candidates from the pairwise counts. The
+        candidates and the counts are passed in, rather than kept on the
+        method, so that a count never sees those of an earlier one.
+        """
         ranks = []
-        for possibility in itertools.permutations(self.preference_options):
+        for possibility in itertools.permutations(preference_options):
             rank = 0
             for index, option1 in enumerate(possibility[:-1]):
                 for option2 in possibility[index + 1:]:
                     key = "%s > %s" % (option1, option2)
-                    rank += self.lookup[key]
+                    rank += lookup.get(key, 0)
             ranks.append((rank, possibility))
         return sorted(ranks, reverse=True)
 
     def get_winner(self, ballotbox, position_count=1):
-        self.preference_options = []
-        self.lookup = self.build_lookup(ballotbox)
-        results = self.get_ranks()
+        # the candidates come from the ballot box's index, rather than from
+        # whichever ballot comes first, which may not list them all
+        results = self.get_ranks(
+            ballotbox.get_candidates(), self.build_lookup(ballotbox))
         return results[0:position_count]
 
+    def get_tally_winner(self, tally, position_count=1):
+        results = self.get_ranks(tally.candidates, tally.pairwise)
+        return results[0:position_count]
+
+    def get_tally_margin(self, tally):
+        return margins.get_pairwise_margin(self, tally)
+
 
 class NansonVoting(borda.StandardBordaVoting):
     """
@@ -133,32 +169,127 @@ class NansonVoting(borda.StandardBordaVoting):
         klass = ballotbox.__class__
         return klass(method=self.__class__)
 
-    def _get_dropped_candidates(self, ballotbox):
+    def _get_dropped_candidates(self, totals):
         """
         Drop the candidates whose scores are lower than the average Borda score
-        of all candidates in the ballotbox.
+        of all candidates in the round.
         """
-        counts = self.get_counts(ballotbox)
-        points = [count for count, candidate in counts]
-        average = sum(points)/float(len(counts))
-        return [candidate for count, candidate in counts if count < average]
+        total = sum(totals.values())
+        return [candidate for candidate, count in totals.items()
+                if count * len(totals) < total]
 
-    def iterate(self, ballotbox):
+    def iterate(self, ballotbox, remaining):
+        """
+        Return a new ballot box holding only the remaining candidates, ranked
+        as if they were the only ones on the ballots.
+        """
         new_ballotbox = self._get_new_ballotbox(ballotbox)
-        dropped = self._get_dropped_candidates(ballotbox)
         for preferences, votes in ballotbox.items():
+            ranks = [rank for candidate, rank in preferences.items()
+                     if candidate in remaining]
             new_preferences = {}
             for candidate, rank in preferences.items():
-                if candidate not in dropped:
-                    new_preferences[candidate] = rank
-            new_ballotbox.add_votes(new_preferences, votes)
+                if candidate in remaining:
+                    new_preferences[candidate] = 1 + len(
+                        [other for other in ranks if other < rank])
+            if new_preferences:
+                new_ballotbox.add_votes(new_preferences, votes)
         return new_ballotbox
 
-    def get_winner(self, ballotbox):
-        self.candidate_count = self.get_candidate_count(ballotbox)
-        while len(ballotbox.keys()[0].keys()) > 1:
-            ballotbox = self.iterate(ballotbox)
-        return self.get_counts(ballotbox)
+    def count_rounds(self, get_round_totals, candidates, state=None,
+                     checkpoint=None):
+        """
+        Count the rounds until no more candidates can be dropped, where
+        get_round_totals(remaining) returns the Borda scores of the remaining
+        candidates. The results rank the candidates by the round they were
+        dropped in (the winner lasting longest), each with their Borda score
+        in the last round they were counted in.
+
+        A long count can be stopped and carried on later: after each round
+        that drops candidates, 'checkpoint' (if given) is called with a dict
+        of the count so far, and a count given such a dict as 'state' carries
+        on from it.
+        """
+        if state is None:
+            state = {"remaining": candidates, "round_number": 0,
+                     "scores": {}, "order": {}}
+        scores = dict(state["scores"])
+        order = dict([(candidate, tuple(key))
+                      for candidate, key in state["order"].items()])
+        remaining = set(state["remaining"])
+        round_number = state["round_number"]
+        while True:
+            round_number += 1
+            totals = get_round_totals(remaining)
+            if len(totals) == 1 and scores:
+                # the winner keeps their score from the last contested round
+                break
+            for candidate, score in totals.items():
+                scores[candidate] = score
+                order[candidate] = (round_number, score)
+            dropped = []
+            if len(totals) > 1:
+                dropped = self._get_dropped_candidates(totals)
+            if not dropped:
+                break
+            remaining -= set(dropped)
+            if checkpoint is not None:
+                checkpoint({"remaining": sorted(remaining),
+                            "round_number": round_number,
+                            "scores": dict(scores), "order": dict(order)})
+        return Results(scores, order=order)
+
+    def get_round_totals(self, ballotbox, remaining):
+        """
+        Return the Borda scores of the remaining candidates, with the points
+        for each rank given by how many candidates remain (kept here, rather
+        than on the method, so that no count sees another's).
+        """
+        candidate_count = len(remaining)
+        histogram = self.iterate(ballotbox, remaining).get_histogram()
+        return dict([
+            (candidate, sum([(candidate_count - rank) * votes
+                             for rank, votes in counts.items()]))
+            for candidate, counts in histogram.items()])
+
+    def get_winner(self, ballotbox, state=None, checkpoint=None):
+        def get_round_totals(remaining):
+            return self.get_round_totals(ballotbox, remaining)
+        return self.count_rounds(
+            get_round_totals, ballotbox.get_candidates(), state, checkpoint)
+
+    def get_tally_winner(self, tally, state=None, checkpoint=None):
+        """
+        On complete ballots, a candidate's Borda score among the remaining
+        candidates is the number of votes ranking them above (or level with)
+        each of the others, so every round is counted from the pairwise
+        counts without going back to the ballots.
+        """
+        histogram = tally.histogram
+        ranked = sum([sum(counts.values()) for counts in histogram.values()])
+        truncated = [counts for counts in histogram.values() if 0 in counts]
+        if truncated or ranked != tally.total_votes * len(tally.candidates):
+            # the points given on truncated ballots are not in the pairwise
+            # counts
+            return self.get_winner(tally.ballotbox, state, checkpoint)
+        pairwise = tally.pairwise
+
+        def get_round_totals(remaining):
+            totals = {}
+            for candidate in remaining:
+                totals[candidate] = sum([
+                    pairwise.get("%s > %s" % (candidate, other), 0) +
+                    pairwise.get("%s = %s" % (candidate, other), 0) +
+                    pairwise.get("%s = %s" % (other, candidate), 0)
+                    for other in remaining if other != candidate])
+            return totals
+        return self.count_rounds(
+            get_round_totals, tally.candidates, state, checkpoint)
+
+    def get_tally_margin(self, tally):
+        # the winner is not the Borda winner, so only the pairwise bounds of
+        # a Condorcet method apply
+        return margins.get_pairwise_margin(self, tally)
 
 
 class BaldwinVoting(NansonVoting):
@@ -182,13 +313,13 @@ class BaldwinVoting(NansonVoting):
     implements(
         IVotingMethod, ICondorcetCriterion, IMajorityCriterion)
 
-    def _get_dropped_candidates(self, ballotbox):
+    def _get_dropped_candidates(self, totals):
         """
-        Drop the candidates who has the lowest Borda score.
+        Drop the candidate who has the lowest Borda score.
         """
-        counts = self.get_counts(ballotbox)
-        COUNT, CANDIDATE = (0, 1)
-        return counts[-1][CANDIDATE]
+        count, candidate = min([
+            (count, candidate) for candidate, count in totals.items()])
+        return [candidate]
 
 
 class RankedPairsVoting(object):
@@ -2,11 +2,28 @@ from zope.interface import implements
 
 from ballotbox.criteria import (
     ICondorcetCriterion, IMajorityCriterion, IPluralityCriterion)
-from ballotbox.iballot import IVotingMethod
+from ballotbox.iballot import ITallyVotingMethod
 from ballotbox.singlewinner.preferential import base
 
 
-class MinimaxWinningVoting(base.PairWiseBase):
+class MinimaxBase(base.PairWiseBase):
+    """
+    This is a base class to hold common code for the minimax variants, which
+    differ only in how the score for one candidate against another is
+    computed from the pairwise comparisons.
+    """
+    def get_score(self, lookup, candidate1, candidate2):
+        raise NotImplementedError()
+
+    def get_winner(self, ballotbox, candidate1, candidate2):
+        return self.get_score(
+            self.build_lookup(ballotbox), candidate1, candidate2)
+
+    def get_tally_winner(self, tally, candidate1, candidate2):
+        return self.get_score(tally.pairwise, candidate1, candidate2)
+
+
+class MinimaxWinningVoting(MinimaxBase):
     """
     The number of voters ranking x above y, but only when this score exceeds
     the number of voters ranking y above x. If not, then the score for x
@@ -18,21 +35,20 @@ class MinimaxWinningVoting(base.PairWiseBase):
     article gave enough information to accurately define it.
     """
     implements(
-        IVotingMethod, ICondorcetCriterion, IMajorityCriterion,
+        ITallyVotingMethod, ICondorcetCriterion, IMajorityCriterion,
         IPluralityCriterion)
 
-    def get_winner(self, ballotbox, candidate1, candidate2):
-        self.lookup = self.build_lookup(ballotbox)
+    def get_score(self, lookup, candidate1, candidate2):
         [(votes_for, comparison), 
          (votes_against, anti_comparison)] = self._compare(
-            candidate1, candidate2)
+            lookup, candidate1, candidate2)
         rank = votes_for - votes_against
         if rank < 0:
             votes_for = 0
         return [(votes_for, comparison)]
 
 
-class MinimaxMarginsVoting(base.PairWiseBase):
+class MinimaxMarginsVoting(MinimaxBase):
     """
     The number of voters ranking x above y minus the number of voters ranking y
     above x. This is called using margins.
@@ -43,18 +59,17 @@ class MinimaxMarginsVoting(base.PairWiseBase):
     article gave enough information to accurately define it.
     """
     implements(
-        IVotingMethod, ICondorcetCriterion, IMajorityCriterion)
+        ITallyVotingMethod, ICondorcetCriterion, IMajorityCriterion)
 
-    def get_winner(self, ballotbox, candidate1, candidate2):
-        self.lookup = self.build_lookup(ballotbox)
+    def get_score(self, lookup, candidate1, candidate2):
         [(votes_for, comparison), 
          (votes_against, anti_comparison)] = self._compare(
-            candidate1, candidate2)
+            lookup, candidate1, candidate2)
         rank = votes_for - votes_against
         return [(rank, comparison)]
 
 
-class MinimaxPairwiseOppositionVoting(base.PairWiseBase):
+class MinimaxPairwiseOppositionVoting(MinimaxBase):
     """
     The number of voters ranking x above y, regardless of whether more voters
     rank x above y or vice versa. This interpretation is sometimes called
@@ -65,13 +80,12 @@ class MinimaxPairwiseOppositionVoting(base.PairWiseBase):
     XXX This implementation may not be correct; I'm not sure the wikipedia
     article gave enough information to accurately define it.
     """
-    implements(IVotingMethod)
+    implements(ITallyVotingMethod)
 
-    def get_winner(self, ballotbox, candidate1, candidate2):
-        self.lookup = self.build_lookup(ballotbox)
+    def get_score(self, lookup, candidate1, candidate2):
         [(votes_for, comparison), 
          (votes_against, anti_comparison)] = self._compare(
-            candidate1, candidate2)
+            lookup, candidate1, candidate2)
         return [(votes_for, comparison)]
 
 
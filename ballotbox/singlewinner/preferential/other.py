@@ -1,3 +1,11 @@
+from zope.interface import implements
+
+from ballotbox.criteria import (
+    IMajorityCriterion, IMonotonicityCriterion, IMutualMajorityCriterion)
+from ballotbox.iballot import ITallyVotingMethod
+from ballotbox.results import Results
+
+
 class BucklinVoting(object):
     """
     Bucklin voting is a class of voting systems that can be used for
@@ -17,7 +25,36 @@ class BucklinVoting(object):
     A majority is determined based on the number of valid ballots. Since, after
     the first round, there may be more votes cast than voters, it is possible
     for more than one candidate to have majority support.
+
+    Only the number of votes giving each candidate each rank is needed, so the
+    count is made from the ballot box's rank histogram in O(candidates ** 2),
+    however many ballots there are. The results carry the accumulated votes
+    of the deciding round.
     """
+    implements(
+        ITallyVotingMethod, IMajorityCriterion, IMutualMajorityCriterion,
+        IMonotonicityCriterion)
+
+    def get_histogram_winner(self, histogram, total_votes):
+        if not histogram:
+            return Results({})
+        ranks = set()
+        for counts in histogram.values():
+            ranks.update([rank for rank in counts if rank > 0])
+        totals = dict.fromkeys(histogram, 0)
+        for rank in sorted(ranks):
+            for candidate, counts in histogram.items():
+                totals[candidate] += counts.get(rank, 0)
+            if 2 * max(totals.values()) > total_votes:
+                break
+        return Results(totals)
+
+    def get_winner(self, ballotbox):
+        return self.get_histogram_winner(
+            ballotbox.get_histogram(), ballotbox.get_total_votes())
+
+    def get_tally_winner(self, tally):
+        return self.get_histogram_winner(tally.histogram, tally.total_votes)
 
 
 class OklahomaVoting(object):
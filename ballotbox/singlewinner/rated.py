@@ -1,3 +1,9 @@
+# -*- coding: utf-8 -*-
+from zope.interface import implementsOnly
+
+from ballotbox.criteria import IMonotonicityCriterion
+from ballotbox.iballot import ITallyVotingMethod
+from ballotbox.results import Results
 from ballotbox.singlewinner.preferential.other import BucklinVoting
 
 
@@ -55,6 +61,119 @@ class ApprovalVoting(RangeVoting):
     range_values = [0, 1]
 
 
+class MajorityValue(object):
+    """
+    The majority value of a candidate: the sequence of grades found by taking
+    the lower median of their grades, removing one copy of it, and repeating
+    until no grades are left.
+
+    The grades at or below the first median are taken from the median
+    downwards, and those above it from the median upwards, so the sequence
+    is kept as two lists of [grade, votes] blocks rather than one grade per
+    ballot, and two majority values are compared a whole block at a time.
+    """
+    def __init__(self, counts):
+        """
+        The parameter 'counts' is a list of (grade_value, votes) tuples,
+        sorted from the worst grade to the best.
+        """
+        total = sum([votes for value, votes in counts])
+        median = (total - 1) // 2
+        self.lower = []
+        self.upper = []
+        seen = 0
+        for value, votes in counts:
+            below = min(votes, max(0, median + 1 - seen))
+            if below:
+                self.lower.insert(0, [value, below])
+            if votes > below:
+                self.upper.append([value, votes - below])
+            seen += votes
+        self.lower_size = median + 1 if total else 0
+        self.upper_size = total - self.lower_size
+
+    def __len__(self):
+        return self.lower_size + self.upper_size
+
+    def _from_lower(self):
+        # the lower median of what is left is the best of the lower grades
+        # unless there are more upper grades than lower ones
+        return self.upper_size <= self.lower_size
+
+    def peek(self):
+        """
+        Return the next grade of the sequence.
+        """
+        if self._from_lower():
+            return self.lower[0][0]
+        return self.upper[0][0]
+
+    def get_phase(self):
+        """
+        Return a key for the pattern the sequence follows from here, and the
+        number of grades it follows it for: while the lower and upper blocks
+        last, the grades alternate between them.
+        """
+        lead = self.upper_size - self.lower_size
+        if lead not in (0, 1) or not self.lower or not self.upper:
+            return (lead, self.peek(), None), 1
+        lower_value, lower_votes = self.lower[0]
+        upper_value, upper_votes = self.upper[0]
+        if lead == 0:
+            steps = min(2 * lower_votes, 2 * upper_votes + 1)
+        else:
+            steps = min(2 * upper_votes, 2 * lower_votes + 1)
+        return (lead, lower_value, upper_value), steps
+
+    def _take(self, blocks, count):
+        while count:
+            taken = min(count, blocks[0][1])
+            blocks[0][1] -= taken
+            count -= taken
+            if not blocks[0][1]:
+                del blocks[0]
+
+    def advance(self, steps):
+        """
+        Remove the next 'steps' grades of the sequence, which must not be
+        more than get_phase allows.
+        """
+        if steps == 1:
+            from_lower = int(self._from_lower())
+        elif self.upper_size == self.lower_size:
+            from_lower = (steps + 1) // 2
+        else:
+            from_lower = steps // 2
+        self._take(self.lower, from_lower)
+        self._take(self.upper, steps - from_lower)
+        self.lower_size -= from_lower
+        self.upper_size -= steps - from_lower
+
+
+def compare_majority_values(counts1, counts2):
+    """
+    Compare the majority values of two candidates, given as lists of
+    (grade_value, votes) tuples, returning a negative number, zero or a
+    positive number as the first is worse than, equal to or better than the
+    second.
+    """
+    value1 = MajorityValue(counts1)
+    value2 = MajorityValue(counts2)
+    while len(value1) and len(value2):
+        phase1, steps1 = value1.get_phase()
+        phase2, steps2 = value2.get_phase()
+        if phase1 == phase2:
+            steps = min(steps1, steps2)
+        else:
+            result = cmp(value1.peek(), value2.peek())
+            if result:
+                return result
+            steps = 1
+        value1.advance(steps)
+        value2.advance(steps)
+    return 0
+
+
 class MajorityJudgement(BucklinVoting):
     """
     Majority Judgment is a single-winner voting system proposed by Michel
@@ -84,4 +203,72 @@ class MajorityJudgement(BucklinVoting):
     list, the new lists are, respectively, {"Good", "Good", "Poor"} and
     {"Excellent", "Fair", "Fair"}, so X would win with a recalculated median of
     "Good".
+
+    Each ballot is a dict mapping candidates to grades. Grades are numbers,
+    higher being better, unless the 'grades' parameter is given: a list of
+    the names of the grades, from worst to best. Every ballot should grade
+    every candidate.
+
+    Only the number of votes giving each candidate each grade is needed, so
+    the count is made from the rank histogram, and the medians are removed a
+    block of equal grades at a time (see MajorityValue): comparing two
+    candidates takes O(grades) steps rather than one step per ballot. The
+    results rank the candidates by their majority values, each with their
+    median grade; candidates are only tied if their majority values are the
+    same.
     """
+    # majority judgment fails the majority criteria that Bucklin passes
+    implementsOnly(ITallyVotingMethod, IMonotonicityCriterion)
+
+    def __init__(self, grades=None):
+        self.grades = grades
+
+    def get_grade_value(self, grade):
+        if self.grades is None:
+            return grade
+        return self.grades.index(grade)
+
+    def get_counts(self, counts):
+        """
+        Return a candidate's grades as a sorted list of (grade_value, votes)
+        tuples, from the worst grade to the best.
+        """
+        return sorted([
+            (self.get_grade_value(grade), votes)
+            for grade, votes in counts.items() if votes])
+
+    def get_median(self, counts):
+        """
+        Return the lower median grade of a candidate's grades.
+        """
+        total = sum(counts.values())
+        seen = 0
+        for value, grade, votes in sorted([
+                (self.get_grade_value(grade), grade, votes)
+                for grade, votes in counts.items()]):
+            seen += votes
+            if 2 * seen > total - 1:
+                return grade
+
+    def get_histogram_winner(self, histogram, total_votes):
+        """
+        Returns Results with each candidate's median grade as their score.
+        """
+        counts = dict([
+            (candidate, self.get_counts(grades))
+            for candidate, grades in histogram.items()])
+        candidates = sorted(
+            counts,
+            lambda candidate1, candidate2: compare_majority_values(
+                counts[candidate1], counts[candidate2]))
+        order = {}
+        place = 0
+        for index, candidate in enumerate(candidates):
+            if index and compare_majority_values(
+                    counts[candidates[index - 1]], counts[candidate]):
+                place = index
+            order[candidate] = place
+        scores = dict([
+            (candidate, self.get_median(grades))
+            for candidate, grades in histogram.items()])
+        return Results(scores, order=order)
@@ -1,7 +1,8 @@
 from zope.interface import implements
-from decimal import Decimal
 
-from ballotbox.iballot import IVotingMethod
+from ballotbox import margins
+from ballotbox.iballot import IMarginVotingMethod
+from ballotbox.results import Results
 
 
 class MajorityRuleVoting(object):
@@ -17,13 +18,23 @@ class MajorityRuleVoting(object):
     plurality to choose an alternative that has fewer than fifty percent of the
     votes cast in its favor.
     """
-    implements(IVotingMethod)
+    implements(IMarginVotingMethod)
+
+    def get_majority(self, counts, total_votes):
+        # more than half the votes, compared exactly in integers
+        position_count = 0
+        for name, votes in counts.items():
+            if 2 * votes > total_votes:
+                position_count = 1
+        return Results(counts, position_count)
 
     def get_winner(self, ballotbox):
-        total_votes = ballotbox.get_total_votes()
-        winner = []
-        for name, votes in ballotbox.items():
-            fraction = Decimal(votes) / Decimal(total_votes)
-            if fraction > Decimal(".5"):
-                winner = [(votes, name)]
-        return winner
+        return self.get_majority(
+            dict(ballotbox.items()), ballotbox.get_total_votes())
+
+    def get_tally_winner(self, tally):
+        return self.get_majority(tally.first_preferences, tally.total_votes)
+
+    def get_tally_margin(self, tally):
+        return margins.get_majority_margin(
+            tally.first_preferences, tally.total_votes)
@@ -0,0 +1,358 @@
+"""
+A compact binary file of ballots.
+
+The file starts with a header and the table of candidates, followed by one
+fixed-width row per ballot:
+
+    * the header: the magic string "BBOX", the format version and the number
+      of candidates (little-endian unsigned shorts), and the number of rows
+      (an unsigned 64-bit integer)
+
+    * the candidate table: for each candidate, the length of their name in
+      UTF-8 (an unsigned short) and the name, padded with zeros so the rows
+      start on an 8-byte boundary
+
+    * the rows: the rank the ballot gives each candidate in the table, as an
+      unsigned short (rank 0 is kept for unranked candidates on truncated
+      ballots, and UNLISTED marks a candidate not on the ballot at all),
+      followed by the number of votes cast with the ballot as an unsigned
+      32-bit integer
+
+A BallotFile memory-maps the file, so opening it only reads the header. If
+NumPy is installed, the rows are also given as a NumPy array viewing the
+mapped file without copying it, and the rank histogram, the first preferences
+(among any remaining candidates, as instant-runoff rounds need) and the
+pairwise counts are counted from it in vectorized passes; otherwise they are
+counted a row at a time.
+"""
+import mmap
+import struct
+
+from ballotbox.tally import Tally, get_preferences
+
+
+MAGIC = "BBOX"
+VERSION = 1
+UNLISTED = 0xffff
+HEADER = struct.Struct("<4sHHQ")
+NAME_LENGTH = struct.Struct("<H")
+WEIGHT = struct.Struct("<I")
+
+
+# numpy takes longer to import than most counts take, so it is only imported
+# once a file's rows are counted (None if it isn't installed)
+_numpy = []
+
+
+def get_numpy():
+    if not _numpy:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy.append(numpy)
+    return _numpy[0]
+
+
+def get_row_struct(candidate_count):
+    return struct.Struct("<%sH%s" % (candidate_count, WEIGHT.format[1:]))
+
+
+def pack_table(candidates):
+    table = []
+    for candidate in candidates:
+        name = unicode(candidate).encode("utf-8")
+        table.append(NAME_LENGTH.pack(len(name)) + name)
+    table = "".join(table)
+    padding = -(HEADER.size + len(table)) % 8
+    return table + "\0" * padding
+
+
+def pack_row(row_struct, index, vote, votes):
+    if not 0 <= votes <= 0xffffffff:
+        raise ValueError("%s votes do not fit in a row" % votes)
+    ranks = [UNLISTED] * len(index)
+    for candidate, rank in get_preferences(vote).items():
+        if candidate not in index:
+            raise ValueError("%r is not in the candidate table" % candidate)
+        if not 0 <= rank < UNLISTED:
+            raise ValueError("rank %s cannot be stored" % rank)
+        ranks[index[candidate]] = rank
+    ranks.append(votes)
+    return row_struct.pack(*ranks)
+
+
+def write_ballots(path, ballots, candidates=None):
+    """
+    Write a list of (vote, count) tuples to a ballot file at 'path',
+    returning the number of rows written.
+
+    If the candidates are given, the ballots are streamed to the file as they
+    come; otherwise they are read once to find the candidates first.
+    """
+    if candidates is None:
+        ballots = list(ballots)
+        found = set()
+        for vote, votes in ballots:
+            found.update(get_preferences(vote).keys())
+        candidates = sorted(found)
+    candidates = list(candidates)
+    index = dict([(candidate, position)
+                  for position, candidate in enumerate(candidates)])
+    row_struct = get_row_struct(len(candidates))
+    row_count = 0
+    with open(path, "wb") as ballot_file:
+        ballot_file.write(HEADER.pack(MAGIC, VERSION, len(candidates), 0))
+        ballot_file.write(pack_table(candidates))
+        for vote, votes in ballots:
+            ballot_file.write(pack_row(row_struct, index, vote, votes))
+            row_count += 1
+        ballot_file.seek(0)
+        ballot_file.write(
+            HEADER.pack(MAGIC, VERSION, len(candidates), row_count))
+    return row_count
+
+
+class BallotFile(object):
+    """
+    A memory-mapped ballot file, answering items() and get_total_votes() like
+    a ballot box does.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(
+            self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, candidate_count, self.row_count = (
+            HEADER.unpack_from(self._data))
+        if magic != MAGIC:
+            raise ValueError("%s is not a ballot file" % path)
+        if version != VERSION:
+            raise ValueError("unknown ballot file version %s" % version)
+        offset = HEADER.size
+        self.candidates = []
+        for position in xrange(candidate_count):
+            length, = NAME_LENGTH.unpack_from(self._data, offset)
+            offset += NAME_LENGTH.size
+            name = self._data[offset:offset + length].decode("utf-8")
+            self.candidates.append(name)
+            offset += length
+        self.offset = offset + (-offset % 8)
+        self.row_struct = get_row_struct(candidate_count)
+
+    def __len__(self):
+        return self.row_count
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def get_row(self, index):
+        """
+        Return the ranks of the row at 'index' (UNLISTED for candidates not on
+        the ballot) and the number of votes cast with it.
+        """
+        row = self.row_struct.unpack_from(
+            self._data, self.offset + index * self.row_struct.size)
+        return row[:-1], row[-1]
+
+    def iterrows(self):
+        for index in xrange(self.row_count):
+            yield self.get_row(index)
+
+    def decode_row(self, ranks):
+        """
+        Return the ballot of a row: the candidate, for a ballot listing only
+        its first choice, and otherwise a dict of preferences.
+        """
+        preferences = dict([
+            (candidate, rank)
+            for candidate, rank in zip(self.candidates, ranks)
+            if rank != UNLISTED])
+        if len(preferences) == 1 and preferences.values() == [1]:
+            return preferences.keys()[0]
+        return preferences
+
+    def iteritems(self):
+        for ranks, votes in self.iterrows():
+            yield self.decode_row(ranks), votes
+
+    def items(self):
+        return list(self.iteritems())
+
+    def get_rows(self):
+        """
+        Return the rows as a NumPy record array, with fields 'ranks' and
+        'weight', viewing the mapped file without copying it.
+        """
+        numpy = get_numpy()
+        if numpy is None:
+            raise ImportError("NumPy is needed to view the rows of a file")
+        dtype = numpy.dtype([
+            ("ranks", "<u2", (len(self.candidates),)), ("weight", "<u4")])
+        return numpy.frombuffer(
+            self._data, dtype, self.row_count, self.offset)
+
+    def get_total_votes(self):
+        numpy = get_numpy()
+        if numpy is not None:
+            return int(self.get_rows()["weight"].sum(dtype=numpy.uint64))
+        return sum([votes for ranks, votes in self.iterrows()])
+
+    def get_histogram(self):
+        """
+        Return the rank histogram, as Tally.histogram gives it.
+        """
+        numpy = get_numpy()
+        histogram = {}
+        if numpy is not None:
+            rows = self.get_rows()
+            weights = rows["weight"].astype(numpy.uint64)
+            for position, candidate in enumerate(self.candidates):
+                ranks = rows["ranks"][:, position]
+                listed = ranks != UNLISTED
+                if not listed.any():
+                    continue
+                # summed as 64-bit integers, which stay exact where a
+                # bincount's float weights would not
+                counts = numpy.zeros(
+                    int(ranks[listed].max()) + 1, numpy.uint64)
+                numpy.add.at(counts, ranks[listed], weights[listed])
+                histogram[candidate] = dict([
+                    (rank, int(count)) for rank, count in enumerate(counts)
+                    if count])
+            return histogram
+        for ranks, votes in self.iterrows():
+            for candidate, rank in zip(self.candidates, ranks):
+                if rank != UNLISTED:
+                    counts = histogram.setdefault(candidate, {})
+                    counts[rank] = counts.get(rank, 0) + votes
+        return histogram
+
+    def get_first_preferences(self, remaining=None):
+        """
+        Return a dict mapping each candidate to the votes of the ballots
+        ranking them first; a ballot ranking several candidates first counts
+        for each of them. If 'remaining' is given, only those candidates are
+        counted, each ballot going to its first choice among them, as in a
+        round of an instant-runoff count.
+        """
+        numpy = get_numpy()
+        if remaining is None:
+            remaining = self.candidates
+        positions = [self.candidates.index(candidate)
+                     for candidate in remaining]
+        counts = {}
+        if numpy is not None:
+            rows = self.get_rows()
+            ranks = rows["ranks"][:, positions].astype(numpy.int32)
+            # unranked and unlisted candidates are never first
+            ranks[(ranks == 0) | (ranks == UNLISTED)] = UNLISTED
+            first = ranks.min(axis=1)
+            weights = rows["weight"].astype(numpy.uint64)
+            for column, candidate in enumerate(remaining):
+                chosen = (ranks[:, column] == first) & (first != UNLISTED)
+                votes = int(weights[chosen].sum())
+                if votes:
+                    counts[candidate] = votes
+            return counts
+        for ranks, votes in self.iterrows():
+            ranks = [ranks[position] for position in positions]
+            ranked = [rank for rank in ranks if 0 < rank < UNLISTED]
+            if not ranked:
+                continue
+            first = min(ranked)
+            for candidate, rank in zip(remaining, ranks):
+                if rank == first:
+                    counts[candidate] = counts.get(candidate, 0) + votes
+        return counts
+
+    def get_pairwise(self):
+        """
+        Return the pairwise counts, as Tally.pairwise gives them, for the
+        candidates listed together on each ballot.
+        """
+        numpy = get_numpy()
+        pairs = {}
+        candidate_count = len(self.candidates)
+        if numpy is not None:
+            rows = self.get_rows()
+            weights = rows["weight"].astype(numpy.uint64)
+            listed = rows["ranks"] != UNLISTED
+            for position1 in xrange(candidate_count - 1):
+                ranks1 = rows["ranks"][:, position1]
+                for position2 in xrange(position1 + 1, candidate_count):
+                    ranks2 = rows["ranks"][:, position2]
+                    both = listed[:, position1] & listed[:, position2]
+                    option1 = self.candidates[position1]
+                    option2 = self.candidates[position2]
+                    for lookup, chosen in [
+                            ("%s > %s" % (option1, option2), ranks1 < ranks2),
+                            ("%s > %s" % (option2, option1), ranks2 < ranks1),
+                            ("%s = %s" % (option1, option2),
+                             ranks1 == ranks2)]:
+                        votes = int(weights[both & chosen].sum())
+                        if votes:
+                            pairs[lookup] = votes
+            return pairs
+        for ranks, votes in self.iterrows():
+            for position1 in xrange(candidate_count - 1):
+                rank1 = ranks[position1]
+                if rank1 == UNLISTED:
+                    continue
+                for position2 in xrange(position1 + 1, candidate_count):
+                    rank2 = ranks[position2]
+                    if rank2 == UNLISTED:
+                        continue
+                    option1 = self.candidates[position1]
+                    option2 = self.candidates[position2]
+                    if rank1 < rank2:
+                        lookup = "%s > %s" % (option1, option2)
+                    elif rank2 < rank1:
+                        lookup = "%s > %s" % (option2, option1)
+                    else:
+                        lookup = "%s = %s" % (option1, option2)
+                    pairs[lookup] = pairs.get(lookup, 0) + votes
+        return pairs
+
+    def get_tally(self):
+        """
+        Return a FileTally of the ballots, counted from the rows.
+        """
+        return FileTally(self)
+
+
+class FileTally(Tally):
+    """
+    A tally of a ballot file whose first preferences, histogram and total
+    are counted from the rows (in vectorized passes, with NumPy) when it is
+    made, and whose pairwise counts are counted from them when they are
+    first needed. The ballots are only decoded if a method counts from them.
+    """
+    def __init__(self, ballot_file):
+        self.ballot_file = ballot_file
+        self._ballotbox = None
+        self._ballots = None
+        self._pairwise = None
+        self.unranked_tier = False
+        self.total_votes = ballot_file.get_total_votes()
+        self.first_preferences = ballot_file.get_first_preferences()
+        self.histogram = ballot_file.get_histogram()
+        self.candidates = sorted(self.histogram.keys())
+
+    @property
+    def ballots(self):
+        if self._ballots is None:
+            self._ballots = self.ballot_file.items()
+        return self._ballots
+
+    @property
+    def pairwise(self):
+        if self._pairwise is None:
+            self._pairwise = self.ballot_file.get_pairwise()
+        return self._pairwise
+
+    def perturb(self, removed=(), added=()):
+        # the changed tally is counted from its ballots, not from the file
+        tally = Tally(ballots=self.ballots, pairwise=self._pairwise)
+        return tally.perturb(removed, added)
@@ -0,0 +1,323 @@
+"""
+Sufficient statistics for counting a ballot box with many voting methods.
+
+Most preferential methods do not need the ballots themselves, only a summary
+of them: plurality needs the first preferences, the Borda variants need how
+often each candidate was given each rank, and the Condorcet methods need the
+pairwise preference counts. A Tally decodes the ballots once and builds these
+summaries, so that evaluating several methods costs little more than counting
+with one of them.
+"""
+from zope.interface import implements
+
+from ballotbox.iballot import IResults, ITally, ITallyVotingMethod
+
+
+def add_pairs(pairs, preferences, votes):
+    """
+    Add the pairwise preferences of a single ballot to 'pairs', a dict keyed
+    by "A > B" (or "A = B" for equal ranks) strings.
+    """
+    preference_list = preferences.items()
+    for index, preference1 in enumerate(preference_list[:-1]):
+        for preference2 in preference_list[index + 1:]:
+            option1, rank1 = preference1
+            option2, rank2 = preference2
+            # remember, first choice is "1" and that's a lower number
+            # than "2", so the lower the amount, the greater the
+            # preference
+            if rank1 < rank2:
+                lookup = "%s > %s" % (option1, option2)
+            elif rank2 < rank1:
+                lookup = "%s > %s" % (option2, option1)
+            else:
+                lookup = "%s = %s" % (option1, option2)
+            pairs.setdefault(lookup, 0)
+            pairs[lookup] += votes
+
+
+def add_ranks(histogram, preferences, votes):
+    """
+    Add the ranks given by a single ballot to 'histogram', a dict mapping each
+    candidate to a dict of the number of votes giving them each rank.
+    """
+    for candidate, rank in preferences.items():
+        counts = histogram.setdefault(candidate, {})
+        counts[rank] = counts.get(rank, 0) + votes
+
+
+def add_unranked_pairs(pairs, candidates, ranked_votes, total_votes):
+    """
+    Add the pairwise preferences of the unranked tiers of a set of ballots to
+    'pairs', which already counts the ranked candidates of each ballot: every
+    ranked candidate is preferred to each candidate the ballot leaves
+    unranked, and candidates both left unranked are level. 'ranked_votes'
+    maps each candidate to the number of votes ranking them.
+
+    Both follow from how often each candidate and each pair of candidates
+    were ranked, so the tiers cost O(candidates ** 2) once, rather than for
+    every ballot.
+    """
+    for index, option1 in enumerate(candidates):
+        for option2 in candidates[index + 1:]:
+            lookups = ["%s > %s" % (option1, option2),
+                       "%s > %s" % (option2, option1),
+                       "%s = %s" % (option1, option2),
+                       "%s = %s" % (option2, option1)]
+            both = sum([pairs.get(lookup, 0) for lookup in lookups])
+            votes1 = ranked_votes.get(option1, 0)
+            votes2 = ranked_votes.get(option2, 0)
+            for lookup, votes in [
+                    (lookups[0], votes1 - both),
+                    (lookups[1], votes2 - both),
+                    (lookups[2], total_votes - votes1 - votes2 + both)]:
+                if votes:
+                    pairs[lookup] = pairs.get(lookup, 0) + votes
+
+
+def get_winning_candidate(results):
+    """
+    Return the single winner of the results of a count, or None if there is
+    no winner or the first place is tied. A winning ranking (as returned by
+    Kemeny-Young) is won by its first candidate.
+    """
+    if IResults.providedBy(results):
+        return results.winner
+    if not results:
+        return None
+    if len(results) > 1 and results[0][0] == results[1][0]:
+        return None
+    winner = results[0][1]
+    if isinstance(winner, tuple):
+        winner = winner[0]
+    return winner
+
+
+def get_pair(pairwise, candidate1, candidate2):
+    """
+    Return the number of votes preferring candidate1 to candidate2.
+    """
+    return pairwise.get("%s > %s" % (candidate1, candidate2), 0)
+
+
+def get_ranked(preferences):
+    """
+    Return the candidates a ballot ranks (with a rank above 0) and their
+    ranks.
+    """
+    return dict([(candidate, rank) for candidate, rank in preferences.items()
+                 if rank > 0])
+
+
+def get_preferences(vote):
+    """
+    Return a ballot as a dict of preferences. A plurality vote (a single
+    candidate) or a multi-mark vote (a list of candidates) ranks each of its
+    candidates first.
+    """
+    if isinstance(vote, dict):
+        return vote
+    if isinstance(vote, list):
+        return dict.fromkeys(vote, 1)
+    return {vote: 1}
+
+
+class Tally(object):
+    """
+    The ballots of a ballot box, decoded once, and the statistics that the
+    voting methods are counted from:
+
+        * first_preferences: a dict mapping each candidate to the number of
+          ballots which rank them first
+
+        * histogram: a dict mapping each candidate to a dict of the number of
+          ballots giving them each rank (rank 0 is used for unranked
+          candidates on truncated ballots)
+
+        * pairwise: a dict mapping "A > B" to the number of ballots that
+          prefer A to B, in the same form as PairWiseBase.build_lookup
+
+    The first preferences and the histogram are built while the ballots are
+    decoded; the pairwise counts are built from the decoded ballots the first
+    time they are needed, since they cost O(candidates ** 2) per ballot.
+
+    The tally also answers items() and get_total_votes() like a ballot box
+    does, with the ballots already decoded.
+
+    A tally can also be made directly from a list of (vote, count) tuples,
+    optionally with pairwise counts that are already known (e.g., derived from
+    another tally); the ballot box for methods that need one is then only
+    filled the first time it is asked for.
+
+    When most voters rank only a few of many candidates, the ballots can be
+    kept sparse, listing only the candidates they rank, by setting
+    'unranked_tier': every candidate of the election (given by 'candidates',
+    or else every candidate on any ballot) that a ballot does not rank is
+    then in its unranked tier, below the candidates it ranks and level with
+    each other. The pairwise counts are then built in O(ranked ** 2) per
+    ballot, and the histogram only counts the ranked candidates, since an
+    unranked candidate scores nothing in a Borda count.
+    """
+    implements(ITally)
+
+    def __init__(self, ballotbox=None, ballots=None, pairwise=None,
+                 candidates=None, unranked_tier=False):
+        self._ballotbox = ballotbox
+        self.ballots = []
+        self.total_votes = 0
+        self.first_preferences = {}
+        self.histogram = {}
+        self.unranked_tier = unranked_tier
+        self._pairwise = pairwise
+        if ballots is None:
+            ballots = ballotbox.items()
+        for vote, votes in ballots:
+            self.add_ballot(vote, votes)
+        if candidates is None:
+            candidates = self.histogram.keys()
+        self.candidates = sorted(candidates)
+
+    @property
+    def ballotbox(self):
+        if self._ballotbox is None:
+            # imported here, since the ballot box module depends on this one
+            from ballotbox.ballot import BallotBox
+            ballotbox = BallotBox()
+            ballotbox.batch_votes(self.ballots)
+            self._ballotbox = ballotbox
+        return self._ballotbox
+
+    def add_ballot(self, vote, votes):
+        self.ballots.append((vote, votes))
+        self.count_ballot(vote, votes)
+
+    def count_ballot(self, vote, votes):
+        """
+        Add a ballot to the total, the histogram and the first preferences.
+        """
+        self.total_votes += votes
+        preferences = get_preferences(vote)
+        if self.unranked_tier:
+            preferences = get_ranked(preferences)
+        add_ranks(self.histogram, preferences, votes)
+        ranks = [rank for rank in preferences.values() if rank > 0]
+        if not ranks:
+            return
+        first = min(ranks)
+        for candidate, rank in preferences.items():
+            if rank == first:
+                self.first_preferences.setdefault(candidate, 0)
+                self.first_preferences[candidate] += votes
+
+    @property
+    def pairwise(self):
+        if self._pairwise is None:
+            pairs = {}
+            if not self.unranked_tier:
+                for vote, votes in self.ballots:
+                    add_pairs(pairs, get_preferences(vote), votes)
+                self._pairwise = pairs
+                return pairs
+            ranked_votes = {}
+            for vote, votes in self.ballots:
+                preferences = get_ranked(get_preferences(vote))
+                add_pairs(pairs, preferences, votes)
+                for candidate in preferences:
+                    ranked_votes[candidate] = (
+                        ranked_votes.get(candidate, 0) + votes)
+            add_unranked_pairs(
+                pairs, self.candidates, ranked_votes, self.total_votes)
+            self._pairwise = pairs
+        return self._pairwise
+
+    def perturb(self, removed=(), added=()):
+        """
+        Return a new tally with the (vote, count) tuples in 'removed' taken
+        out of this one and those in 'added' put in; a ValueError is raised if
+        more votes are removed than were cast. If the pairwise counts of
+        this tally have been built, those of the new tally are updated from
+        them for the changed ballots only, rather than built again from every
+        ballot.
+        """
+        ballots = list(self.ballots)
+        taken = []
+        for vote, votes in removed:
+            remaining = votes
+            for index, (old_vote, old_votes) in enumerate(ballots):
+                if not remaining:
+                    break
+                if old_vote != vote or not old_votes:
+                    continue
+                count = min(old_votes, remaining)
+                ballots[index] = (old_vote, old_votes - count)
+                remaining -= count
+                # the tally's own copy of the ballot gives the same pairwise
+                # keys that were counted for it
+                taken.append((old_vote, count))
+            if remaining:
+                raise ValueError("%r was only cast %s times, not %s" % (
+                    vote, votes - remaining, votes))
+        ballots = [(vote, votes) for vote, votes in ballots if votes]
+        ballots.extend(added)
+        pairwise = None
+        # the unranked tiers depend on the whole tally, so they are counted
+        # again rather than updated
+        if self._pairwise is not None and not self.unranked_tier:
+            pairwise = dict(self._pairwise)
+            for vote, votes in taken:
+                add_pairs(pairwise, get_preferences(vote), -votes)
+            for vote, votes in added:
+                add_pairs(pairwise, get_preferences(vote), votes)
+        candidates = None
+        if self.unranked_tier:
+            candidates = self.candidates
+        return self.__class__(
+            ballots=ballots, pairwise=pairwise, candidates=candidates,
+            unranked_tier=self.unranked_tier)
+
+    def items(self):
+        return list(self.ballots)
+
+    def get_histogram(self):
+        return self.histogram
+
+    def get_candidates(self):
+        return self.candidates
+
+    def get_total_votes(self):
+        return self.total_votes
+
+    def get_winner(self, method, *args, **kwargs):
+        """
+        Count the tally with the given IVotingMethod provider. Methods which
+        can count from the tally's statistics do so; any other method is
+        given the original ballot box.
+        """
+        if ITallyVotingMethod.providedBy(method):
+            return method.get_tally_winner(self, *args, **kwargs)
+        return method.get_winner(self.ballotbox, *args, **kwargs)
+
+    def get_margin(self, method, *args, **kwargs):
+        """
+        Return the margin of victory of the count with the given
+        IMarginVotingMethod provider, as a (lower, upper) tuple of bounds on
+        the number of ballots that must change.
+        """
+        return method.get_tally_margin(self, *args, **kwargs)
+
+    def evaluate(self, methods):
+        """
+        Count the tally with each of the given methods, returning a list of
+        their results in the same order.
+
+        Each item of 'methods' is either an IVotingMethod provider or a
+        (method, kwargs) tuple, where 'kwargs' is a dict of keyword arguments
+        for its get_winner method.
+        """
+        results = []
+        for method in methods:
+            kwargs = {}
+            if isinstance(method, tuple):
+                method, kwargs = method
+            results.append(self.get_winner(method, **kwargs))
+        return results
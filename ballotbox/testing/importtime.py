@@ -0,0 +1,129 @@
+"""
+Tracking how long the package takes to import.
+
+Short-lived counters pay for importing the package every time they run, so
+the time taken to import the modules they start from is measured against a
+budget, each in a fresh interpreter (the best of several runs, with the
+modules already compiled), and the modules which are only imported when
+they are used are checked not to be imported before then.
+
+Run it with "make check-imports", or:
+
+    python -m ballotbox.testing.importtime
+"""
+import subprocess
+import sys
+
+
+# the most milliseconds importing each module should take
+BUDGETS = {
+    "ballotbox.singlewinner.preferential": 5,
+    "ballotbox.ballot": 30,
+    "ballotbox.singlewinner.plurality": 30,
+    "ballotbox.singlewinner.preferential.borda": 40,
+    "ballotbox.compaction": 40,
+    "ballotbox.contests": 40,
+    "ballotbox.simulation": 40,
+    "ballotbox.cli": 60,
+    }
+
+# the modules which importing each module should not import
+DEFERRED = {
+    "ballotbox.singlewinner.preferential": [
+        "zope.interface",
+        "ballotbox.singlewinner.preferential.borda",
+        "ballotbox.singlewinner.preferential.condorcet",
+        "ballotbox.singlewinner.preferential.minimax",
+        "ballotbox.singlewinner.preferential.other"],
+    "ballotbox.singlewinner.preferential.borda": [
+        "fractions", "multiprocessing"],
+    "ballotbox.compaction": ["numpy"],
+    "ballotbox.contests": ["multiprocessing"],
+    "ballotbox.simulation": ["multiprocessing"],
+    "ballotbox.cli": [
+        "numpy", "multiprocessing",
+        "ballotbox.singlewinner.preferential.borda",
+        "ballotbox.singlewinner.preferential.condorcet"],
+    }
+
+TIME_SCRIPT = """
+import time
+start = time.time()
+import %s
+print time.time() - start
+"""
+
+MODULES_SCRIPT = """
+import sys
+before = set(sys.modules)
+import %s
+for name in set(sys.modules) - before:
+    if sys.modules[name] is not None:
+        print name
+"""
+
+
+def run_script(script):
+    return subprocess.check_output([sys.executable, "-c", script])
+
+
+def get_import_time(name, repeat=5):
+    """
+    Return the fewest seconds importing the module 'name' took in 'repeat'
+    fresh interpreters.
+    """
+    # the first import compiles the modules, which isn't counted
+    run_script("import %s" % name)
+    return min([float(run_script(TIME_SCRIPT % name))
+                for run in xrange(repeat)])
+
+
+def get_imported(name):
+    """
+    Return the names of the modules importing the module 'name' imports in a
+    fresh interpreter.
+    """
+    return sorted(run_script(MODULES_SCRIPT % name).split())
+
+
+def get_early_imports(name, deferred=None):
+    """
+    Return the modules of 'deferred' (by default, those listed for 'name' in
+    DEFERRED) which importing 'name' imports.
+    """
+    if deferred is None:
+        deferred = DEFERRED.get(name, [])
+    imported = set(get_imported(name))
+    return [module for module in deferred if module in imported]
+
+
+def check_imports(budgets=None, repeat=5):
+    """
+    Return a list of (module, milliseconds, budget, early imports) tuples,
+    one for each module with a budget.
+    """
+    if budgets is None:
+        budgets = BUDGETS
+    results = []
+    for name, budget in sorted(budgets.items()):
+        milliseconds = get_import_time(name, repeat) * 1000
+        results.append((name, milliseconds, budget, get_early_imports(name)))
+    return results
+
+
+def main():
+    failed = False
+    for name, milliseconds, budget, early in check_imports():
+        status = "ok"
+        if milliseconds > budget or early:
+            status = "FAIL"
+            failed = True
+        print "%-45s %6.1fms (budget %sms) %s" % (
+            name, milliseconds, budget, status)
+        for module in early:
+            print "    imports %s" % module
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
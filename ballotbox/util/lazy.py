@@ -0,0 +1,45 @@
+"""
+Packages whose names are imported from their modules when first used.
+"""
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    A package which imports each of the names in 'attributes' (a dict
+    mapping each name to the module it is defined in) the first time it is
+    looked up, rather than when the package is imported.
+    """
+    def __init__(self, module, attributes):
+        super(LazyModule, self).__init__(module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+        # the package's own module is kept, or its globals would be cleared
+        self.__module = module
+        self.__attributes = attributes
+
+    def __getattr__(self, name):
+        # only called for names not yet looked up
+        try:
+            module_name = self.__attributes[name]
+        except KeyError:
+            raise AttributeError(
+                "'module' object has no attribute %r" % name)
+        value = getattr(importlib.import_module(module_name), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__.keys()) | set(self.__attributes))
+
+
+def make_lazy(name, attributes):
+    """
+    Replace the package 'name' with a LazyModule importing 'attributes' from
+    their modules when they are first looked up; called from the package's
+    __init__.py.
+    """
+    module = sys.modules[name]
+    module.__all__ = sorted(attributes)
+    sys.modules[name] = LazyModule(module, attributes)